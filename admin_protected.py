@@ -82,17 +82,23 @@ def logout(request: Request):
 
 @router.delete("/ui/delete_company/{company_name}")
 def delete_company(company_name: str, user=Depends(manager)):
-    from api_server import collection
+    from vector_store import collection, notify_write
     results = collection.get(where={"msp_name": company_name})
     ids_to_delete = results["ids"]
     if ids_to_delete:
         collection.delete(ids=ids_to_delete)
+    import company_store
+    company_store.delete_summary(company_name)
+    notify_write(company_name)
     return {"status": "deleted", "count": len(ids_to_delete)}
 
 @router.delete("/ui/delete/{entry_id}")
 def delete_entry(entry_id: str, user=Depends(manager)):
-    from api_server import collection
+    from vector_store import collection, notify_write
+    entry = collection.get(ids=[entry_id], include=["metadatas"])
     collection.delete(ids=[entry_id])
+    for meta in entry["metadatas"]:
+        notify_write((meta or {}).get("msp_name"))
     return {"status": "success"}
 
 @router.get("/auth/check")
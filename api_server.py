@@ -4,10 +4,17 @@ from msp_core import (
     run_msp_information_summary_claude,
     run_msp_information_summary_pplx,
     extract_msp_name,
+    aextract_msp_name,
+    msp_name_extraction_scope,
     collection,
-    run_msp_news_summary_claude
+    run_msp_news_summary_claude,
+    prepare_msp_recommendation,
+    prepare_msp_information_summary_claude,
+    prepare_msp_news_summary_mcp,
+    stream_claude_plan
 )
-from utils import fix_korean_encoding
+from utils import fix_korean_encoding, run_blocking, normalize_score
+from clova_client import aclose_client, close_client
 from fastapi import File, UploadFile
 from excel_upload_handler import compute_category_scores_from_excel_data, summarize_answers_for_subcategories
 from clova_router import Executor
@@ -18,11 +25,19 @@ import datetime
 from dotenv import load_dotenv
 load_dotenv()
 from fastapi import FastAPI, HTTPException, Depends, Request
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 import io
 import json
+import base64
+import itertools
+import threading
 
 from multi_llm import run_multi_llm_msp_recommendation
+import company_store
+import leaderboard
+import response_cache
+from response_cache import cached_call
+from retriever import build_where, metadata_matches
 
 group_to_category_cache = {}
 
@@ -44,8 +59,7 @@ def load_user(username: str):
     if username == env_username:
         return User(name=username)
 
-import chromadb
-from chromadb import PersistentClient
+from vector_store import collection, register_write_hook, notify_write, scores_numeric, migrate_scores
 
 app = FastAPI()
 
@@ -62,143 +76,35 @@ app.add_middleware(
 app.include_router(admin_router)
 print("📦 admin router included")
 
-# Load ChromaDB
-CHROMA_PATH = os.path.abspath("chroma_store")
-client = PersistentClient(path=CHROMA_PATH)
-collection = client.get_or_create_collection("msp_chunks")
+@app.on_event("startup")
+async def start_score_migration():
+    # Older stores can hold numeric-string scores that Chroma's $gte skips; convert them in the background
+    # (score filters run in Python until this finishes)
+    if not scores_numeric():
+        threading.Thread(target=run_score_migration, name="score-migration", daemon=True).start()
 
-def manual_category_calculation(grouped_data, total_avg):
-    """Fallback manual calculation if the existing logic fails"""
-    
-    # Enhanced group-to-category mapping based on your existing patterns
-    group_to_category_mapping = {
-        # Human Resources (인적역량)
-        "AI 전문 인력 구성": "인적역량",
-        "프로젝트 경험 및 성공 사례": "인적역량", 
-        "지속적인 교육 및 학습": "인적역량",
-        "프로젝트 관리 및 커뮤니케이션": "인적역량",
-        "AI 윤리 및 책임 의식": "인적역량",
-        
-        # AI Technology (AI기술역량)
-        "AI 기술 연구 능력": "AI기술역량",
-        "AI 모델 개발 능력": "AI기술역량",
-        "AI 플랫폼 및 인프라 구축 능력": "AI기술역량", 
-        "데이터 처리 및 분석 능력": "AI기술역량",
-        "AI 기술의 융합 및 활용 능력": "AI기술역량",
-        "AI 기술의 특허 및 인증 보유 현황": "AI기술역량",
-        
-        # Solution (솔루션 역량)
-        "다양성 및 전문성": "솔루션 역량",
-        "안정성": "솔루션 역량", 
-        "확장성 및 유연성": "솔루션 역량",
-        "사용자 편의성": "솔루션 역량",
-        "보안성": "솔루션 역량",
-        "기술 지원 및 유지보수": "솔루션 역량",
-        "차별성 및 경쟁력": "솔루션 역량",
-        "개발 로드맵 및 향후 계획": "솔루션 역량"
-    }
-    
-    # Aggregate scores by main category
-    main_categories = ["인적역량", "AI기술역량", "솔루션 역량"]
-    category_data = {cat: [] for cat in main_categories}
-    
-    for group_name, items in grouped_data.items():
-        # Map group to main category
-        main_category = group_to_category_mapping.get(group_name)
-        
-        # Fallback: keyword matching
-        if not main_category:
-            group_lower = group_name.lower()
-            if any(keyword in group_lower for keyword in ["인력", "교육", "학습", "관리", "커뮤니케이션", "윤리", "프로젝트"]):
-                main_category = "인적역량"
-            elif any(keyword in group_lower for keyword in ["ai", "기술", "모델", "플랫폼", "인프라", "데이터", "융합", "특허", "연구"]):
-                main_category = "AI기술역량"
-            elif any(keyword in group_lower for keyword in ["솔루션", "다양성", "안정성", "확장성", "편의성", "보안", "지원", "차별성", "로드맵"]):
-                main_category = "솔루션 역량"
-        
-        # Add scores to appropriate category
-        if main_category and main_category in category_data:
-            for item in items:
-                category_data[main_category].append(item["score"])
-    
-    # Calculate averages
-    category_scores = {}
-    for cat in main_categories:
-        if category_data[cat]:
-            category_scores[cat] = round(sum(category_data[cat]) / len(category_data[cat]), 2)
-        else:
-            # Use total average as fallback
-            category_scores[cat] = total_avg
-    
-    return category_scores
+def run_score_migration():
+    try:
+        migrate_scores()
+    except Exception as e:
+        print(f"[WARNING] Score migration failed, score filters stay in Python: {e}")
+
+@app.on_event("shutdown")
+async def close_clova_clients():
+    await aclose_client()
+    close_client()
 
 def calculate_msp_category_scores(msp_name: str):
     """
     Calculate category scores for a specific MSP using the same logic as the upload summary
     """
-    try:
-        # Get all data for this MSP
-        results = collection.get(
-            where={"msp_name": msp_name},
-            include=["metadatas"]
-        )
-        
-        if not results["metadatas"]:
-            return {"total_score": 0, "category_scores": {cat: 0 for cat in ["인적역량", "AI기술역량", "솔루션 역량"]}}
-        
-        # Organize data by group (similar to your upload logic)
-        grouped_data = {}
-        all_scores = []
-        
-        for meta in results["metadatas"]:
-            question = meta.get("question", "")
-            answer = meta.get("answer", "")
-            score = meta.get("score")
-            group = meta.get("group", "Unknown").strip()
-            
-            if not question or not answer or score is None:
-                continue
-                
-            all_scores.append(score)
-            
-            if group not in grouped_data:
-                grouped_data[group] = []
-            
-            grouped_data[group].append({
-                "question": question,
-                "answer": answer,
-                "score": score
-            })
-        
-        # Calculate total average
-        total_avg = sum(all_scores) / len(all_scores) if all_scores else 0
-        
-        # Calculate category scores using your group-to-category mapping logic
-        main_categories = ["인적역량", "AI기술역량", "솔루션 역량"]
-        category_scores = {}
-        
-        try:
-            # Use manual calculation since we're dealing with ChromaDB data
-            category_scores = manual_category_calculation(grouped_data, total_avg)
-        except Exception as e:
-            print(f"[WARNING] Manual calculation failed for {msp_name}: {e}")
-            # Final fallback: use total average for all categories
-            for cat in main_categories:
-                category_scores[cat] = total_avg
-        
-        # Ensure all main categories are present
-        for cat in main_categories:
-            if cat not in category_scores:
-                category_scores[cat] = total_avg
-        
-        return {
-            "total_score": round(total_avg, 2),
-            "category_scores": category_scores
-        }
-        
-    except Exception as e:
-        print(f"[ERROR] Failed to calculate scores for {msp_name}: {e}")
-        return {"total_score": 0, "category_scores": {cat: 0 for cat in ["인적역량", "AI기술역량", "솔루션 역량"]}}
+    return leaderboard.calculate_msp_category_scores(collection, msp_name)
+
+def _refresh_leaderboard_row(msp_name):
+    leaderboard.refresh_company(collection, msp_name)
+
+# Keep the materialized leaderboard in step with ingest and delete operations
+register_write_hook(_refresh_leaderboard_row)
 
 # NOW ALL THE ENDPOINTS
 
@@ -226,43 +132,110 @@ def serve_ui(request: Request):
 def serve_query_ui():
     return FileResponse("static/query.html")
 
+# --- Chunk listing helpers shared by the viewer/admin data endpoints ---
+CHUNK_PAGE_MAX_LIMIT = int(os.getenv("CHUNK_PAGE_MAX_LIMIT", "1000"))
+CHUNK_FIELDS = ["msp_name", "question", "score", "answer", "timestamp", "group", "category"]
+
+def build_chunk_where(question: str = None, min_score: int = None, msp_name: str = None):
+    """Translate the viewer filters into a Chroma where clause; see score_filtered_in_python"""
+    return build_where(msp_name=msp_name, min_score=min_score, question=question,
+                       push_score=not score_filtered_in_python(min_score))
+
+def score_filtered_in_python(min_score) -> bool:
+    """Until the store's scores are migrated to numbers, min_score is applied to each page in Python"""
+    return bool(min_score) and not scores_numeric()
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode()).decode()
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        offset = int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["offset"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
+
+def parse_fields(fields: str, default_fields):
+    """Parse a comma-separated projection, rejecting unknown field names"""
+    if not fields:
+        return list(default_fields)
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in CHUNK_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+def iter_chunk_pages(where=None, page_size: int = 500, offset: int = 0, max_items: int = None):
+    """
+    Page through chunk metadatas with Chroma limit/offset.
+    Yields (metadatas, next_offset) per page; next_offset is None once the store is exhausted.
+    """
+    fetched = 0
+    while True:
+        size = page_size if max_items is None else min(page_size, max_items - fetched)
+        if size <= 0:
+            return
+        results = collection.get(where=where, limit=size, offset=offset, include=["metadatas"])
+        metadatas = results["metadatas"]
+        offset += len(metadatas)
+        fetched += len(metadatas)
+        exhausted = len(metadatas) < size
+        yield metadatas, None if exhausted else offset
+        if exhausted:
+            return
+
+def project_chunk(meta, fields):
+    """Shape one metadata record for the response; None when it has no usable answer or score"""
+    if not isinstance(meta.get("answer"), str) or not meta["answer"].strip():
+        return None
+    if meta.get("score") is None:
+        return None
+    return {field: meta.get(field) for field in fields}
+
+def list_chunks(question, min_score, msp_name, limit, cursor, fields, default_fields):
+    """
+    Shared implementation of /ui/data and /ui/data_flat.
+    Without limit the full filtered list is returned as before; with limit a page plus next_cursor.
+    """
+    where = build_chunk_where(question=question, min_score=min_score, msp_name=msp_name)
+    fields = parse_fields(fields, default_fields)
+    score_min = min_score if score_filtered_in_python(min_score) else None
+
+    def project_page(metadatas):
+        return [item for item in (project_chunk(meta, fields) for meta in metadatas
+                                  if metadata_matches(meta, min_score=score_min, require_answer=False)) if item]
+
+    if limit is None:
+        results = collection.get(where=where, include=["metadatas"])
+        return JSONResponse(content=project_page(results["metadatas"]))
+
+    if limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    limit = min(limit, CHUNK_PAGE_MAX_LIMIT)
+    offset = decode_cursor(cursor) if cursor else 0
+
+    metadatas, next_offset = next(iter_chunk_pages(where=where, page_size=limit, offset=offset, max_items=limit))
+    items = project_page(metadatas)
+    return JSONResponse(content={
+        "items": items,
+        "next_cursor": encode_cursor(next_offset) if next_offset is not None else None
+    })
+
 @app.get("/ui/data")
-def get_filtered_chunks(question: str = None, min_score: int = 0):
+def get_filtered_chunks(question: str = None, min_score: int = 0, msp_name: str = None,
+                        limit: int = None, cursor: str = None, fields: str = None):
     # Return flat format for public UI compatibility
-    results = collection.get(include=["metadatas"])
-    data = []
-    for meta in results["metadatas"]:
-        if not isinstance(meta.get("answer"), str) or not meta["answer"].strip():
-            continue
-        if question and question != meta["question"]:
-            continue
-        if meta["score"] is not None and int(meta["score"]) >= min_score:
-            data.append({
-                "msp_name": meta["msp_name"],
-                "question": meta["question"],
-                "score": meta["score"],
-                "answer": meta["answer"]
-            })
-    return JSONResponse(content=data)
+    return list_chunks(question, min_score, msp_name, limit, cursor, fields,
+                       default_fields=["msp_name", "question", "score", "answer"])
 
 # Flat data endpoint for public UI
 @app.get("/ui/data_flat")
-def get_flat_chunks(question: str = None, min_score: int = 0):
-    results = collection.get(include=["metadatas"])
-    data = []
-    for meta in results["metadatas"]:
-        if not isinstance(meta.get("answer"), str) or not meta["answer"].strip():
-            continue
-        if question and question != meta["question"]:
-            continue
-        if meta["score"] is not None and int(meta["score"]) >= min_score:
-            data.append({
-                "msp_name": meta["msp_name"],
-                "question": meta["question"],
-                "score": meta["score"],
-                "answer": meta["answer"]
-            })
-    return JSONResponse(content=data)
+def get_flat_chunks(question: str = None, min_score: int = 0, msp_name: str = None,
+                    limit: int = None, cursor: str = None, fields: str = None):
+    return list_chunks(question, min_score, msp_name, limit, cursor, fields,
+                       default_fields=["msp_name", "question", "score", "answer"])
 
 # Query/Ask endpoint
 @app.post("/query/ask")
@@ -273,18 +246,24 @@ async def ask_question(request: Request):
     if not question:
         raise HTTPException(status_code=400, detail="Missing question")
 
-    return run_msp_recommendation(question, min_score)
+    return await run_blocking(cached_call, "recommend", question, min_score,
+                              run_msp_recommendation, question, min_score)
 
 # Router endpoint
 @app.post("/query/router")
 async def query_router(data: RouterQuery):
+    # Router call and name extraction are awaited; blocking handlers run on the bounded pool
+    with msp_name_extraction_scope():
+        return await _query_router(data)
+
+async def _query_router(data: RouterQuery):
     print(f"🟢 Advanced toggle received: {data.advanced}")
     executor = Executor()
     request_data = {
         "query": data.query,
         "chatHistory": data.chat_history
     }
-    raw_result = executor.execute(request_data)
+    raw_result = await executor.aexecute(request_data)
 
     import json
     import traceback
@@ -299,19 +278,25 @@ async def query_router(data: RouterQuery):
         blocked = result.get("blockedContent", {}).get("result", [])
 
         if domain_result == "mspevaluator":
-            extracted_name = extract_msp_name(data.query)
-            print(f"🧠 CLOVA 추출 회사명: {extracted_name}")
             print(f"🟢 Advanced toggle received: {data.advanced}")
             if "Information" in blocked:
+                # Memoized for this request, so the summary handler reuses it
+                extracted_name = await aextract_msp_name(data.query)
+                print(f"🧠 추출 회사명: {extracted_name}")
+                # Scope by company so similar questions about different MSPs never share an answer
                 if data.advanced:
-                    return run_multi_llm_msp_recommendation(data.query)
+                    return await run_blocking(cached_call, f"multi_llm_information:{extracted_name}", data.query, 0,
+                                              run_multi_llm_msp_recommendation, data.query, min_score=0)
                 else:
-                    return run_msp_information_summary_claude(data.query)
+                    return await run_blocking(cached_call, f"information:{extracted_name}", data.query, None,
+                                              run_msp_information_summary_claude, data.query)
             elif "Recommend" in blocked:
                 if data.advanced:
-                    return run_multi_llm_msp_recommendation(data.query, min_score=0)  # ADD THIS
+                    return await run_blocking(cached_call, "multi_llm_recommend", data.query, 0,
+                                              run_multi_llm_msp_recommendation, data.query, min_score=0)  # ADD THIS
                 else:
-                    return run_msp_recommendation(data.query, min_score=0)
+                    return await run_blocking(cached_call, "recommend", data.query, 0,
+                                              run_msp_recommendation, data.query, min_score=0)
             elif "Unrelated" in blocked:
                 return {"answer": "본 시스템은 MSP 평가 도구입니다. 해당 질문은 지원하지 않습니다. 다른 질문을 입력해 주세요."}
             else:
@@ -325,7 +310,99 @@ async def query_router(data: RouterQuery):
 # Advanced Naver route
 @app.post("/query/advanced_naver")
 async def query_advanced_naver(data: RouterQuery):
-    return run_msp_news_summary_mcp(data.query)
+    with msp_name_extraction_scope():
+        return await run_blocking(run_msp_news_summary_mcp, data.query)
+
+# --- Streaming (SSE) variants of the answer routes ---
+# Event order: "evidence" (retrieved evidence + resolved MSP name) as soon as retrieval finishes,
+# then "token" events with answer text, then "final" with the same body the JSON route returns.
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+def stream_plan_events(prepare, *args):
+    """SSE body for a prepare_* function from msp_core (runs in Starlette's threadpool)"""
+    import traceback
+    try:
+        plan = prepare(*args)
+        yield sse_event("evidence", {
+            "msp_name": plan.get("msp_name"),
+            "evidence": plan.get("evidence", []),
+            "web_evidence": plan.get("web_evidence", [])
+        })
+        for kind, payload in stream_claude_plan(plan):
+            yield sse_event(kind, {"text": payload} if kind == "token" else payload)
+    except HTTPException as e:
+        yield sse_event("error", {"detail": e.detail})
+    except Exception as e:
+        traceback.print_exc()
+        yield sse_event("error", {"detail": str(e)})
+
+def stream_result_events(func, *args, **kwargs):
+    """SSE body for handlers without token streaming (multi-LLM): a single final event"""
+    import traceback
+    try:
+        yield sse_event("final", func(*args, **kwargs))
+    except HTTPException as e:
+        yield sse_event("error", {"detail": e.detail})
+    except Exception as e:
+        traceback.print_exc()
+        yield sse_event("error", {"detail": str(e)})
+
+def stream_router_events(data: RouterQuery):
+    import traceback
+    try:
+        result = Executor().execute({
+            "query": data.query,
+            "chatHistory": data.chat_history
+        })
+        if isinstance(result, str):
+            result = json.loads(result)
+
+        domain_result = result.get("domain", {}).get("result")
+        blocked = result.get("blockedContent", {}).get("result", [])
+    except Exception as e:
+        traceback.print_exc()
+        yield sse_event("error", {"detail": f"Router 처리 중 오류 발생: {str(e)}"})
+        return
+
+    if domain_result != "mspevaluator":
+        yield sse_event("final", {"answer": "도메인 분류에 실패했습니다. 다시 시도해 주세요."})
+    elif "Information" in blocked:
+        if data.advanced:
+            yield from stream_result_events(run_multi_llm_msp_recommendation, data.query, min_score=0)
+        else:
+            yield from stream_plan_events(prepare_msp_information_summary_claude, data.query)
+    elif "Recommend" in blocked:
+        if data.advanced:
+            yield from stream_result_events(run_multi_llm_msp_recommendation, data.query, min_score=0)
+        else:
+            yield from stream_plan_events(prepare_msp_recommendation, data.query, 0)
+    elif "Unrelated" in blocked:
+        yield sse_event("final", {"answer": "본 시스템은 MSP 평가 도구입니다. 해당 질문은 지원하지 않습니다. 다른 질문을 입력해 주세요."})
+    else:
+        yield sse_event("final", {"answer": "질문 의도를 정확히 분류하지 못했습니다. 다시 시도해 주세요."})
+
+@app.post("/query/ask/stream")
+async def ask_question_stream(request: Request):
+    body = await request.json()
+    question = body.get("question")
+    min_score = int(body.get("min_score", 0))
+    if not question:
+        raise HTTPException(status_code=400, detail="Missing question")
+
+    return StreamingResponse(stream_plan_events(prepare_msp_recommendation, question, min_score),
+                             media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/query/router/stream")
+async def query_router_stream(data: RouterQuery):
+    return StreamingResponse(stream_router_events(data), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/query/advanced_naver/stream")
+async def query_advanced_naver_stream(data: RouterQuery):
+    return StreamingResponse(stream_plan_events(prepare_msp_news_summary_mcp, data.query),
+                             media_type="text/event-stream", headers=SSE_HEADERS)
 
 # Add protected /admin route using same login logic as /ui
 @app.get("/admin")
@@ -553,43 +630,44 @@ async def get_group_to_category_map():
         raise HTTPException(status_code=500, detail=f"Group-to-category map failed: {str(e)}")
 
 @app.get("/api/leaderboard")
-async def get_leaderboard():
+async def get_leaderboard(request: Request):
     try:
-        # Get all unique MSP names
-        results = collection.get(include=["metadatas"])
-        msp_names = set()
-        
-        for meta in results["metadatas"]:
-            msp_name = meta.get("msp_name")
-            if msp_name:
-                msp_names.add(msp_name)
-        
-        print(f"[DEBUG] Found {len(msp_names)} unique MSPs: {list(msp_names)}")
-        
-        # Calculate scores for each MSP using the unified logic
-        leaderboard = []
-        for msp_name in msp_names:
-            print(f"[DEBUG] Calculating scores for: {msp_name}")
-            scores = calculate_msp_category_scores(msp_name)
-            
-            leaderboard.append({
-                "name": msp_name,
-                "total_score": scores["total_score"],
-                "category_scores": scores["category_scores"]
-            })
-            
-            print(f"[DEBUG] {msp_name}: Total={scores['total_score']}, Categories={scores['category_scores']}")
-        
-        # Sort by total score (descending)
-        leaderboard.sort(key=lambda x: x["total_score"], reverse=True)
-        
-        return JSONResponse(content=leaderboard)
+        # Served from the materialized table; the store version doubles as the ETag
+        rows, version = leaderboard.get_leaderboard(collection)
+        etag = f'"leaderboard-{version}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        print(f"[DEBUG] Serving leaderboard for {len(rows)} MSPs (version {version})")
+        return JSONResponse(content=rows, headers={"ETag": etag})
 
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Leaderboard generation failed: {str(e)}")
 
+@app.get("/api/company_summary/{msp_name}")
+async def get_company_summary(msp_name: str):
+    """Company-level summary scores stored once per MSP at ingest time"""
+    import company_store
+    summary = company_store.get_summary(msp_name)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"No summary stored for {msp_name}")
+    return summary
+
+@app.get("/api/cache_stats")
+async def get_cache_stats(user=Depends(manager)):
+    """Hit/miss metrics for the local score, embedding, Naver search and response caches"""
+    from evaluator import score_cache
+    from vector_writer import embedding_cache
+    from msp_core import naver_search
+    return {
+        "score_cache": score_cache.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "naver_search_cache": naver_search.search_cache.stats(),
+        "response_cache": response_cache.stats()
+    }
+
 # Optional: Add a debug endpoint to test individual MSP calculation
 @app.get("/api/debug_msp/{msp_name}")
 async def debug_msp_calculation(msp_name: str):
@@ -718,7 +796,7 @@ async def fix_existing_data():
                 "msp_name": msp_name,
                 "question": question,
                 "answer": answer,
-                "score": meta.get("score", 0),
+                "score": normalize_score(meta.get("score", 0)),  # numeric strings -> numbers for score filters
                 "group": group_name,  # Use inferred group
                 "category": category,
                 "timestamp": meta.get("timestamp", datetime.datetime.now(datetime.timezone.utc).isoformat())
@@ -757,6 +835,9 @@ async def fix_existing_data():
                     except Exception as e2:
                         print(f"[ERROR] Failed to update individual item: {e2}")
         
+        if updated_count:
+            notify_write(None)
+
         return {
             "message": f"Updated {updated_count} entries",
             "msp_names_found": list(msp_names),
@@ -903,7 +984,7 @@ async def refresh_leaderboard_public():
                     "msp_name": msp_name,
                     "question": question,
                     "answer": answer,
-                    "score": meta.get("score", 0),
+                    "score": normalize_score(meta.get("score", 0)),
                     "group": group_name,
                     "category": category,
                     "timestamp": meta.get("timestamp", datetime.datetime.now(datetime.timezone.utc).isoformat())
@@ -934,6 +1015,9 @@ async def refresh_leaderboard_public():
                             updated_count += 1
                         except Exception as e2:
                             print(f"[ERROR] Individual update failed: {e2}")
+
+        if updated_count:
+            notify_write(None)
         
         return {
             "success": True, 
@@ -1021,29 +1105,62 @@ def auto_redirect_by_language(request: Request):
     else:
         return RedirectResponse(url="/")
 
+ADMIN_EXPORT_PAGE_SIZE = int(os.getenv("ADMIN_EXPORT_PAGE_SIZE", "500"))
+
 @app.get("/admin/data_with_timestamps")
-def get_admin_data_with_timestamps():
-    """Admin-specific endpoint that includes timestamp data"""
+def get_admin_data_with_timestamps(format: str = "json", limit: int = None, offset: int = 0):
+    """
+    Admin-specific endpoint that includes timestamp data.
+    Streams records page by page as a JSON array (default) or NDJSON (format=ndjson),
+    so memory stays bounded by the page size; limit/offset select a window of the store.
+    """
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'ndjson'")
+    if offset < 0 or (limit is not None and limit <= 0):
+        raise HTTPException(status_code=400, detail="limit must be positive and offset non-negative")
+
+    fields = ["msp_name", "question", "score", "answer", "timestamp", "group", "category"]
     try:
-        results = collection.get(include=["metadatas"])
-        data = []
-        
-        for meta in results["metadatas"]:
-            if not isinstance(meta.get("answer"), str) or not meta["answer"].strip():
-                continue
-                
-            data.append({
-                "msp_name": meta["msp_name"],
-                "question": meta["question"],
-                "score": meta["score"],
-                "answer": meta["answer"],
-                "timestamp": meta.get("timestamp"),
-                "group": meta.get("group"),
-                "category": meta.get("category")
-            })
-        
-        return JSONResponse(content=data)
-        
+        pages = iter_chunk_pages(
+            where=build_chunk_where(), page_size=ADMIN_EXPORT_PAGE_SIZE, offset=offset, max_items=limit
+        )
+        # Pull the first page up front so store errors still surface as a 500
+        first_page = next(pages, ([], None))
     except Exception as e:
         print(f"Error in admin timestamp endpoint: {e}")
         return JSONResponse(content=[], status_code=500)
+
+    def records():
+        for metadatas, _ in itertools.chain([first_page], pages):
+            for meta in metadatas:
+                if not isinstance(meta.get("answer"), str) or not meta["answer"].strip():
+                    continue
+                yield {field: meta.get(field) for field in fields}
+
+    # Headers are already sent when a later page fails, so the failure must show in the body:
+    # the exception aborts the response (no closing "]", no final chunk), and NDJSON clients also
+    # get an explicit {"error": ...} line. A truncated export never looks complete.
+    def stream_json():
+        yield "["
+        first = True
+        try:
+            for record in records():
+                yield ("" if first else ",") + json.dumps(record, ensure_ascii=False)
+                first = False
+        except Exception as e:
+            print(f"Error while streaming admin timestamp data, aborting response: {e}")
+            raise
+        yield "]"
+
+    def stream_ndjson():
+        try:
+            for record in records():
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+        except Exception as e:
+            print(f"Error while streaming admin timestamp data, aborting response: {e}")
+            yield json.dumps({"error": f"export truncated: {str(e)}"}, ensure_ascii=False) + "\n"
+            raise
+
+    if format == "ndjson":
+        return StreamingResponse(stream_ndjson(), media_type="application/x-ndjson")
+    return StreamingResponse(stream_json(), media_type="application/json")
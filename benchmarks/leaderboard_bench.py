@@ -0,0 +1,80 @@
+"""
+Benchmark the leaderboard computation modes on synthetic chunk metadata.
+
+Usage: python benchmarks/leaderboard_bench.py [--msps 500] [--chunks 200] [--repeat 3]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+# Keep the benchmark away from the real company store
+os.environ.setdefault("COMPANY_STORE_PATH", os.path.join(tempfile.mkdtemp(), "company_store.sqlite3"))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import leaderboard
+
+GROUPS = list(leaderboard.GROUP_TO_CATEGORY_MAPPING) + ["기타 AI 관련 역량", "Unknown"]
+
+
+def make_metadatas(n_msps, n_chunks, seed=42):
+    rng = random.Random(seed)
+    metadatas = []
+    for m in range(n_msps):
+        msp_name = f"MSP_{m:04d}"
+        for c in range(n_chunks):
+            metadatas.append({
+                "msp_name": msp_name,
+                "question": f"질문 {c}",
+                "answer": "" if rng.random() < 0.02 else f"답변 {c}",
+                "score": rng.randint(0, 5),
+                "group": rng.choice(GROUPS),
+            })
+    # Rows the upload path can produce when evaluation fails or scores come back as text
+    metadatas.append({"msp_name": "MSP_0000", "question": "질문 x", "answer": "답변 x",
+                      "score": "Error in API response: timeout", "group": GROUPS[0]})
+    metadatas.append({"msp_name": "MSP_0001", "question": "질문 y", "answer": "답변 y",
+                      "score": "4", "group": GROUPS[1]})
+    rng.shuffle(metadatas)
+    return metadatas
+
+
+def best_of(fn, metadatas, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(metadatas)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--msps", type=int, default=500)
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    metadatas = make_metadatas(args.msps, args.chunks)
+    print(f"{args.msps} MSPs x {args.chunks} chunks = {len(metadatas)} rows")
+
+    per_msp_time, per_msp_rows = best_of(leaderboard.compute_leaderboard_per_msp, metadatas, args.repeat)
+    vectorized_time, vectorized_rows = best_of(leaderboard.compute_leaderboard, metadatas, args.repeat)
+
+    expected = {row["name"]: row for row in per_msp_rows}
+    actual = {row["name"]: row for row in vectorized_rows}
+    if expected != actual:
+        mismatched = [name for name in expected if expected[name] != actual.get(name)]
+        print(f"❌ Results differ for {len(mismatched)} MSPs, e.g. {mismatched[:3]}")
+        sys.exit(1)
+
+    print(f"per_msp:    {per_msp_time * 1000:8.1f} ms")
+    print(f"vectorized: {vectorized_time * 1000:8.1f} ms ({per_msp_time / vectorized_time:.1f}x)")
+    print("✅ Both modes produce identical leaderboards")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Regression checks for MSP name resolution (msp_name_index) on a small in-memory company list.
+
+Usage: python benchmarks/name_index_check.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from msp_name_index import MspNameIndex
+
+NAMES = ["베스핀글로벌", "(주)에스케이", "메가존클라우드", "LG CNS", "클루커스", "삼성SDS", "AI 웍스", "이노"]
+
+# (query, expected best_match)
+BEST_MATCH_CASES = [
+    ("베스핀", "베스핀글로벌"),            # prefix, not the romanized near-miss "(주)에스케이"
+    ("베스핀 글로벌", "베스핀글로벌"),
+    ("메가존", "메가존클라우드"),
+    ("에스케이", "(주)에스케이"),
+    ("lg cns", "LG CNS"),
+    ("클루커스", "클루커스"),
+    ("요즘", None),
+]
+
+# (question, expected find_mention)
+MENTION_CASES = [
+    ("베스핀글로벌의 AI 역량은?", "베스핀글로벌"),
+    ("메가존클라우드 최근 뉴스", "메가존클라우드"),
+    ("요즘 뉴스 알려줘", None),
+    ("(주)에스케이의 보안 역량", "(주)에스케이"),
+    ("lg cns 클라우드 사례", "LG CNS"),
+    ("이노베이션 사례가 있는 회사", None),   # 2-char alias "이노" inside another word
+    ("이노의 AI 역량", "이노"),
+]
+
+
+class FakeCollection:
+    def get(self, where=None, limit=None, offset=0, include=None):
+        rows = [{"msp_name": name} for name in NAMES][offset:offset + limit]
+        return {"ids": [str(i) for i in range(len(rows))], "metadatas": rows}
+
+
+def main():
+    index = MspNameIndex(FakeCollection())
+    failures = []
+    for query, expected in BEST_MATCH_CASES:
+        actual = index.best_match(query)
+        if actual != expected:
+            failures.append(f"best_match({query!r}) = {actual!r}, expected {expected!r}")
+    for question, expected in MENTION_CASES:
+        actual = index.find_mention(question)
+        if actual != expected:
+            failures.append(f"find_mention({question!r}) = {actual!r}, expected {expected!r}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"✅ {len(BEST_MATCH_CASES) + len(MENTION_CASES)} name resolution checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import os
+import re
+import math
+import threading
+import unicodedata
+from collections import Counter
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Hangul is indexed as overlapping character n-grams, which copes with particles and
+# compounds (e.g. "특허를", "특허출원") without a morphological analyzer
+BM25_HANGUL_NGRAM = int(os.getenv("BM25_HANGUL_NGRAM", "2"))
+
+HANGUL_RUN = re.compile(r"[가-힣]+")
+LATIN_WORD = re.compile(r"[a-z0-9]+(?:[+#][a-z0-9+#]*)?")
+
+
+def tokenize(text: str):
+    """Latin/digit words as whole tokens ("rag", "text2sql", "mlops"); Hangul runs as character n-grams"""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    tokens = LATIN_WORD.findall(text)
+    n = BM25_HANGUL_NGRAM
+    for run in HANGUL_RUN.findall(text):
+        if len(run) <= n:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + n] for i in range(len(run) - n + 1))
+    return tokens
+
+
+def chunk_text(metadata: dict, document: str = None) -> str:
+    """Text indexed for a chunk: the evaluation question and answer"""
+    metadata = metadata or {}
+    parts = [metadata.get("question") or "", metadata.get("answer") or ""]
+    if not parts[1] and document:
+        parts.append(document)
+    return "\n".join(part for part in parts if part)
+
+
+class Bm25Index:
+    """
+    In-process BM25 index over chunk questions/answers.
+    Built lazily from one paged scan of the vector store and kept current through company_store
+    write hooks, which re-index the affected company only.
+    """
+
+    def __init__(self, collection, page_size=1000):
+        self.collection = collection
+        self.page_size = page_size
+        self._lock = threading.RLock()
+        self._built = False
+        self._postings = {}     # term -> {chunk id: term frequency}
+        self._lengths = {}      # chunk id -> token count
+        self._records = {}      # chunk id -> (metadata, document)
+        self._by_company = {}   # msp_name -> set of chunk ids
+        self._total_length = 0
+
+    # --- maintenance ---
+    def _add_locked(self, chunk_id, metadata, document):
+        if chunk_id in self._lengths:
+            self._remove_locked(chunk_id)
+        metadata = metadata or {}
+        tokens = tokenize(chunk_text(metadata, document))
+        for term, tf in Counter(tokens).items():
+            self._postings.setdefault(term, {})[chunk_id] = tf
+        self._lengths[chunk_id] = len(tokens)
+        self._records[chunk_id] = (metadata, document)
+        self._by_company.setdefault(metadata.get("msp_name"), set()).add(chunk_id)
+        self._total_length += len(tokens)
+
+    def _remove_locked(self, chunk_id):
+        metadata, document = self._records.pop(chunk_id)
+        for term in set(tokenize(chunk_text(metadata, document))):
+            postings = self._postings.get(term)
+            if postings:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(chunk_id)
+        company_ids = self._by_company.get(metadata.get("msp_name"))
+        if company_ids:
+            company_ids.discard(chunk_id)
+            if not company_ids:
+                del self._by_company[metadata.get("msp_name")]
+
+    def _scan(self, where=None):
+        offset = 0
+        while True:
+            page = self.collection.get(where=where, limit=self.page_size, offset=offset,
+                                       include=["metadatas", "documents"])
+            documents = page.get("documents") or [None] * len(page["ids"])
+            yield from zip(page["ids"], page["metadatas"], documents)
+            offset += len(page["ids"])
+            if len(page["ids"]) < self.page_size:
+                break
+
+    def rebuild(self):
+        """Rescan every chunk page by page"""
+        records = list(self._scan())
+        with self._lock:
+            self._postings.clear()
+            self._lengths.clear()
+            self._records.clear()
+            self._by_company.clear()
+            self._total_length = 0
+            for chunk_id, metadata, document in records:
+                self._add_locked(chunk_id, metadata, document)
+            self._built = True
+        print(f"[DEBUG] BM25 index built with {len(records)} chunks")
+
+    def invalidate(self):
+        with self._lock:
+            self._built = False
+
+    def refresh(self, msp_name=None):
+        """Write hook: re-index one company after ingest/delete, or drop the index when many changed"""
+        if msp_name is None:
+            self.invalidate()
+            return
+        with self._lock:
+            if not self._built:
+                return
+        records = list(self._scan(where={"msp_name": msp_name}))
+        with self._lock:
+            for chunk_id in list(self._by_company.get(msp_name, ())):
+                self._remove_locked(chunk_id)
+            for chunk_id, metadata, document in records:
+                self._add_locked(chunk_id, metadata, document)
+
+    def _ensure_built(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.rebuild()
+
+    # --- search ---
+    def search(self, query: str, n_results: int = 20, msp_name: str = None, accept=None):
+        """
+        Return [(chunk id, BM25 score)] best first, optionally restricted to one company
+        and to chunks whose metadata passes accept(metadata)
+        """
+        self._ensure_built()
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        scores = Counter()
+        with self._lock:
+            doc_count = len(self._lengths)
+            if not doc_count:
+                return []
+            avg_length = self._total_length / doc_count
+            allowed = self._by_company.get(msp_name, set()) if msp_name else None
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings.items():
+                    if allowed is not None and chunk_id not in allowed:
+                        continue
+                    if accept is not None and not accept(self._records[chunk_id][0]):
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[chunk_id] / avg_length)
+                    scores[chunk_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores.most_common(n_results)
+
+    def record(self, chunk_id):
+        """(metadata, document) for an indexed chunk, or None"""
+        with self._lock:
+            return self._records.get(chunk_id)
+
+
+def reciprocal_rank_fusion(rankings, k: int = 60):
+    """Fuse several best-first id lists; returns [(id, fused score)] best first"""
+    fused = Counter()
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            fused[chunk_id] += 1.0 / (k + rank + 1)
+    return fused.most_common()
@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", os.path.abspath("cache_store.sqlite3"))
+# Hits record last_access in memory and write it back in batches, so a read is not a SQLite write
+CACHE_ACCESS_FLUSH_SIZE = int(os.getenv("CACHE_ACCESS_FLUSH_SIZE", "256"))
+CACHE_ACCESS_FLUSH_SECONDS = float(os.getenv("CACHE_ACCESS_FLUSH_SECONDS", "30"))
+
+
+def make_cache_key(*parts):
+    """Content-addressed key: sha256 over the JSON encoding of all parts"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PersistentCache:
+    """
+    Small SQLite-backed key/value cache with LRU and TTL eviction.
+    Each cache lives in its own table so several caches can share one database file.
+    Access times are batched (see CACHE_ACCESS_FLUSH_SIZE) and the row count is kept in memory,
+    recounted only when it says the table is over max_entries.
+    """
+
+    def __init__(self, table, max_entries=10000, ttl_seconds=None, path=None,
+                 encode=json.dumps, decode=json.loads):
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path or CACHE_DB_PATH
+        self._encode = encode
+        self._decode = decode
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._touched = {}  # key -> last access not yet written back
+        self._last_flush = self._last_sweep = time.time()
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table}(last_access)")
+        self._conn.commit()
+        self._count = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def _expired(self, created_at, now):
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            if self._expired(row[1], now):
+                cur = self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                self._count -= cur.rowcount
+                self._touched.pop(key, None)
+                self._evictions += 1
+                self._misses += 1
+                return None
+            self._touched[key] = now
+            self._hits += 1
+            if (len(self._touched) >= CACHE_ACCESS_FLUSH_SIZE
+                    or now - self._last_flush >= CACHE_ACCESS_FLUSH_SECONDS):
+                self._flush_access_locked(now)
+                self._conn.commit()
+        return self._decode(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        encoded = self._encode(value)
+        with self._lock:
+            exists = self._conn.execute(f"SELECT 1 FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, encoded, now, now),
+            )
+            self._touched.pop(key, None)
+            if not exists:
+                self._count += 1
+            self._evict_locked(now)
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            cur = self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+            self._count -= cur.rowcount
+            self._touched.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+            self._count = 0
+            self._touched.clear()
+
+    def _flush_access_locked(self, now):
+        if self._touched:
+            self._conn.executemany(
+                f"UPDATE {self.table} SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched.clear()
+        self._last_flush = now
+
+    def _evict_locked(self, now):
+        # TTL sweeps run at most once per flush interval; expired rows are also dropped lazily by get
+        if self.ttl_seconds is not None and now - self._last_sweep >= CACHE_ACCESS_FLUSH_SECONDS:
+            self._last_sweep = now
+            cur = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+            self._evictions += cur.rowcount
+            self._count -= cur.rowcount
+        if self._count <= self.max_entries:
+            return
+        # Other processes may share the table, so recount before evicting
+        self._flush_access_locked(now)
+        self._count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        excess = self._count - self.max_entries
+        if excess > 0:
+            cur = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+            self._evictions += cur.rowcount
+            self._count -= cur.rowcount
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            self._count = entries
+        lookups = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "evictions": self._evictions,
+        }
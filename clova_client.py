@@ -0,0 +1,120 @@
+import os
+import uuid
+import asyncio
+import threading
+import importlib.util
+import httpx
+from dotenv import load_dotenv
+load_dotenv()
+
+CLOVA_HOST = "clovastudio.stream.ntruss.com"
+CLOVA_BASE_URL = f"https://{CLOVA_HOST}"
+
+# Transport settings shared by every CLOVA Studio caller
+CLOVA_POOL_SIZE = int(os.getenv("CLOVA_POOL_SIZE", "20"))
+CLOVA_MAX_CONCURRENCY = int(os.getenv("CLOVA_MAX_CONCURRENCY", "8"))
+CLOVA_TIMEOUT = float(os.getenv("CLOVA_TIMEOUT", "60"))
+CLOVA_CONNECT_TIMEOUT = float(os.getenv("CLOVA_CONNECT_TIMEOUT", "10"))
+CLOVA_KEEPALIVE_EXPIRY = float(os.getenv("CLOVA_KEEPALIVE_EXPIRY", "60"))
+
+# HTTP/2 needs the optional h2 package; fall back to pooled HTTP/1.1 keep-alive without it
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_client = None
+_client_lock = threading.Lock()
+
+# Async counterparts, created lazily inside the running event loop
+_async_client = None
+_async_semaphore = None
+
+# Caps in-flight requests to the CLOVA host across all threads in the process
+_host_semaphore = threading.BoundedSemaphore(CLOVA_MAX_CONCURRENCY)
+
+
+def get_client() -> httpx.Client:
+    """Return the process-wide pooled client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(**_client_settings())
+    return _client
+
+
+def _client_settings():
+    return dict(
+        base_url=CLOVA_BASE_URL,
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=CLOVA_POOL_SIZE,
+            max_keepalive_connections=CLOVA_POOL_SIZE,
+            keepalive_expiry=CLOVA_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(CLOVA_TIMEOUT, connect=CLOVA_CONNECT_TIMEOUT),
+    )
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the event loop's pooled async client, creating it on first use"""
+    global _async_client, _async_semaphore
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(**_client_settings())
+        _async_semaphore = asyncio.Semaphore(CLOVA_MAX_CONCURRENCY)
+    return _async_client
+
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+async def aclose_client():
+    global _async_client, _async_semaphore
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+        _async_semaphore = None
+
+
+def build_headers(api_key=None, request_id=None, extra=None):
+    headers = {
+        "Content-Type": "application/json; charset=utf-8",
+        "Authorization": f"Bearer {api_key or os.getenv('CLOVA_API_KEY')}",
+        "X-NCP-CLOVASTUDIO-REQUEST-ID": request_id or uuid.uuid4().hex,
+    }
+    if extra:
+        headers.update(extra)
+    return headers
+
+
+def post_json(path: str, body: dict, api_key=None, request_id=None, headers=None, timeout=None):
+    """
+    POST a JSON body to a CLOVA Studio path over the shared connection pool.
+    Returns (parsed_json, http_status); raises httpx errors and ValueError on a non-JSON body.
+    """
+    request_headers = build_headers(api_key=api_key, request_id=request_id, extra=headers)
+    with _host_semaphore:
+        response = get_client().post(
+            path,
+            json=body,
+            headers=request_headers,
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+        )
+    return response.json(), response.status_code
+
+
+async def apost_json(path: str, body: dict, api_key=None, request_id=None, headers=None, timeout=None):
+    """Async post_json: same contract, awaits on the event loop instead of blocking a thread"""
+    request_headers = build_headers(api_key=api_key, request_id=request_id, extra=headers)
+    client = get_async_client()
+    async with _async_semaphore:
+        response = await client.post(
+            path,
+            json=body,
+            headers=request_headers,
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+        )
+    return response.json(), response.status_code
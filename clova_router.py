@@ -1,34 +1,36 @@
 # -*- coding: utf-8 -*-
 import base64
 import json
-import http.client
 import uuid
 import os
 from http import HTTPStatus
+from clova_client import CLOVA_HOST, post_json, apost_json
+
+ROUTER_PATH = '/serviceapp/v1/routers/haxvawqc/versions/1/route'
 
 class Executor:
     def __init__(self):
-        self._host = "clovastudio.stream.ntruss.com"
+        self._host = CLOVA_HOST
         self._api_key = os.getenv("CLOVA_API_KEY")
         self._request_id = str(uuid.uuid4())
 
     def _send_request(self, request):
-        headers = {
-            'Content-Type': 'application/json; charset=utf-8',
-            'Authorization': f'Bearer {self._api_key}',
-            'X-NCP-CLOVASTUDIO-REQUEST-ID': self._request_id,
-        }
-
-        conn = http.client.HTTPSConnection(self._host)
-        conn.request('POST', '/serviceapp/v1/routers/haxvawqc/versions/1/route', json.dumps(request), headers)
-        response = conn.getresponse()
-        status = response.status
-        result = json.loads(response.read().decode(encoding='utf-8'))
-        conn.close()
-        return result, status
+        return post_json(
+            ROUTER_PATH,
+            request,
+            api_key=self._api_key,
+            request_id=self._request_id,
+        )
 
-    def execute(self, request):
-        res, status = self._send_request(request)
+    async def _asend_request(self, request):
+        return await apost_json(
+            ROUTER_PATH,
+            request,
+            api_key=self._api_key,
+            request_id=self._request_id,
+        )
+
+    def _handle_response(self, res, status):
         print("📦 CLOVA Router raw response:", res)
         print("📦 CLOVA Router HTTP status:", status)
 
@@ -40,3 +42,11 @@ class Executor:
                 "raw_status": status,
                 "response": res
             }
+
+    def execute(self, request):
+        res, status = self._send_request(request)
+        return self._handle_response(res, status)
+
+    async def aexecute(self, request):
+        res, status = await self._asend_request(request)
+        return self._handle_response(res, status)
@@ -0,0 +1,158 @@
+import os
+import json
+import sqlite3
+import datetime
+import threading
+
+COMPANY_STORE_PATH = os.getenv("COMPANY_STORE_PATH", os.path.abspath("company_store.sqlite3"))
+
+_lock = threading.Lock()
+_conn = sqlite3.connect(COMPANY_STORE_PATH, check_same_thread=False)
+_conn.execute("PRAGMA journal_mode=WAL")
+_conn.execute(
+    "CREATE TABLE IF NOT EXISTS msp_summaries ("
+    "msp_name TEXT PRIMARY KEY, summary TEXT NOT NULL, updated_at TEXT NOT NULL)"
+)
+_conn.execute(
+    "CREATE TABLE IF NOT EXISTS leaderboard ("
+    "msp_name TEXT PRIMARY KEY, total_score REAL NOT NULL, category_scores TEXT NOT NULL, updated_at TEXT NOT NULL)"
+)
+_conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+_conn.commit()
+
+# Callbacks run after the vector store changes; each receives the affected msp_name,
+# or None when many companies may have changed at once
+_write_hooks = []
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def clean_summary(summary):
+    """Flatten [{"Category", "Score"}] summary rows into {category: score}, logging and skipping bad items"""
+    cleaned = {}
+    for item in summary or []:
+        k = item.get('Category')
+        v = item.get('Score')
+        if k is None:
+            print(f"[Metadata Error] Found summary item None as key: {item}")
+            continue
+        if isinstance(v, (str, int, float, bool)) or v is None:
+            cleaned[k] = v
+        else:
+            print(f"[Metadata Error] Key '{k}' has invalid type {type(v)}. Value: {v}")
+    return cleaned
+
+
+def save_summary(msp_name: str, summary: dict, updated_at: str = None):
+    updated_at = updated_at or _now()
+    with _lock:
+        _conn.execute(
+            "INSERT OR REPLACE INTO msp_summaries (msp_name, summary, updated_at) VALUES (?, ?, ?)",
+            (msp_name, json.dumps(summary, ensure_ascii=False), updated_at),
+        )
+        _conn.commit()
+
+
+def get_summary(msp_name: str):
+    with _lock:
+        row = _conn.execute(
+            "SELECT summary, updated_at FROM msp_summaries WHERE msp_name = ?", (msp_name,)
+        ).fetchone()
+    if row is None:
+        return None
+    return {"msp_name": msp_name, "summary": json.loads(row[0]), "updated_at": row[1]}
+
+
+def delete_summary(msp_name: str):
+    with _lock:
+        _conn.execute("DELETE FROM msp_summaries WHERE msp_name = ?", (msp_name,))
+        _conn.commit()
+
+
+# --- Store version and write notifications ---
+def get_meta(key: str, default=None):
+    with _lock:
+        row = _conn.execute("SELECT value FROM store_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def set_meta(key: str, value):
+    with _lock:
+        _conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES (?, ?)", (key, str(value)))
+        _conn.commit()
+
+
+def get_store_version() -> int:
+    return int(get_meta("store_version", 0))
+
+
+def bump_store_version() -> int:
+    """Increment the persistent write counter shared by every process using this store"""
+    with _lock:
+        _conn.execute(
+            "INSERT INTO store_meta (key, value) VALUES ('store_version', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+        version = int(_conn.execute("SELECT value FROM store_meta WHERE key = 'store_version'").fetchone()[0])
+        _conn.commit()
+    return version
+
+
+def register_write_hook(hook):
+    if hook not in _write_hooks:
+        _write_hooks.append(hook)
+
+
+def notify_company_changed(msp_name: str = None) -> int:
+    """Record a vector store write and run the registered hooks; returns the new store version"""
+    version = bump_store_version()
+    for hook in list(_write_hooks):
+        try:
+            hook(msp_name)
+        except Exception as e:
+            print(f"[WARNING] Write hook {getattr(hook, '__name__', hook)} failed for {msp_name}: {e}")
+    return version
+
+
+# --- Materialized leaderboard ---
+def upsert_leaderboard_row(msp_name: str, total_score: float, category_scores: dict):
+    with _lock:
+        _conn.execute(
+            "INSERT OR REPLACE INTO leaderboard (msp_name, total_score, category_scores, updated_at) VALUES (?, ?, ?, ?)",
+            (msp_name, total_score, json.dumps(category_scores, ensure_ascii=False), _now()),
+        )
+        _conn.commit()
+
+
+def delete_leaderboard_row(msp_name: str):
+    with _lock:
+        _conn.execute("DELETE FROM leaderboard WHERE msp_name = ?", (msp_name,))
+        _conn.commit()
+
+
+def replace_leaderboard(rows):
+    """Swap the whole leaderboard table for rows of {name, total_score, category_scores}"""
+    now = _now()
+    with _lock:
+        _conn.execute("DELETE FROM leaderboard")
+        _conn.executemany(
+            "INSERT INTO leaderboard (msp_name, total_score, category_scores, updated_at) VALUES (?, ?, ?, ?)",
+            [
+                (row["name"], row["total_score"], json.dumps(row["category_scores"], ensure_ascii=False), now)
+                for row in rows
+            ],
+        )
+        _conn.commit()
+
+
+def list_leaderboard():
+    with _lock:
+        rows = _conn.execute(
+            "SELECT msp_name, total_score, category_scores FROM leaderboard ORDER BY total_score DESC"
+        ).fetchall()
+    return [
+        {"name": name, "total_score": total_score, "category_scores": json.loads(category_scores)}
+        for name, total_score, category_scores in rows
+    ]
@@ -0,0 +1,139 @@
+import os
+import re
+
+# Evidence token budgets per model; prompt instructions come on top of these
+CONTEXT_BUDGETS = {
+    "claude": int(os.getenv("CONTEXT_BUDGET_CLAUDE", "2500")),
+    "hcx": int(os.getenv("CONTEXT_BUDGET_HCX", "2000")),
+    "perplexity": int(os.getenv("CONTEXT_BUDGET_PERPLEXITY", "1200")),
+}
+CONTEXT_DEFAULT_BUDGET = int(os.getenv("CONTEXT_DEFAULT_BUDGET", "2000"))
+# Cap for a single evidence item, so one long answer cannot crowd out the rest
+CONTEXT_MAX_ITEM_TOKENS = int(os.getenv("CONTEXT_MAX_ITEM_TOKENS", "160"))
+# Weight of the 0-5 evaluation score relative to retrieval relevance when ranking evidence
+CONTEXT_SCORE_WEIGHT = float(os.getenv("CONTEXT_SCORE_WEIGHT", "0.3"))
+# Items that would have to be cut below this are dropped instead
+CONTEXT_MIN_ITEM_TOKENS = 24
+
+# Rough characters-per-token ratios: Hangul/CJK pack far fewer characters into a token than Latin text
+CJK_CHARS_PER_TOKEN = 1.5
+OTHER_CHARS_PER_TOKEN = 4.0
+
+CJK_CHARS = re.compile(r"[ᄀ-ᇿ぀-ヿ㄰-㆏一-鿿가-힣]")
+SENTENCE_BREAK = re.compile(r"(?<=[.!?。])\s+|\n+")
+ELLIPSIS = "..."
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for prompt budgeting (no tokenizer round trip)"""
+    if not text:
+        return 0
+    cjk = len(CJK_CHARS.findall(text))
+    other = len(text) - cjk
+    return int(cjk / CJK_CHARS_PER_TOKEN + other / OTHER_CHARS_PER_TOKEN) + 1
+
+
+def context_budget(model: str) -> int:
+    return CONTEXT_BUDGETS.get(model, CONTEXT_DEFAULT_BUDGET)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Keep whole sentences while they fit in max_tokens; a first sentence that is already too long
+    is cut at the last word boundary that fits. Truncated text ends with "..."
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max_tokens - estimate_tokens(ELLIPSIS)
+
+    kept = ""
+    pos = 0
+    for match in SENTENCE_BREAK.finditer(text):
+        candidate = text[:match.start()]
+        if estimate_tokens(candidate) > limit:
+            break
+        kept = candidate
+        pos = match.end()
+    if kept:
+        return kept.rstrip() + ELLIPSIS if pos < len(text) else kept
+
+    # No sentence boundary fits: fall back to words
+    words = text.split(" ")
+    kept = ""
+    for i in range(1, len(words) + 1):
+        candidate = " ".join(words[:i])
+        if estimate_tokens(candidate) > limit:
+            break
+        kept = candidate
+    if not kept:
+        # A single unbroken run (common in Korean without spaces): cut by characters
+        kept = text[:max(1, int(limit * CJK_CHARS_PER_TOKEN))]
+    return kept.rstrip() + ELLIPSIS
+
+
+def evidence_rank(item) -> float:
+    """Default ranking: retrieval relevance plus a weighted share of the evaluation score"""
+    score = item.get("score") or 0
+    return item.get("relevance", 0.0) + CONTEXT_SCORE_WEIGHT * float(score) / 5
+
+
+def pack_evidence(items, budget: int, render, group_by=None, header=None, rank=evidence_rank,
+                  max_item_tokens: int = CONTEXT_MAX_ITEM_TOKENS, separator: str = "\n"):
+    """
+    Greedily pack the highest-ranked evidence into a token budget.
+
+    render(item) -> text for one item (put the long free text last, it is what gets truncated).
+    With group_by, items are grouped (e.g. per company) under header(group) text, which is charged
+    against the budget when the group's first item is packed; groups are ordered by their best item.
+    Returns {"text", "tokens_used", "budget", "items_used", "items_dropped", "groups"}.
+    """
+    ranked = sorted(items, key=rank, reverse=True)
+    remaining = budget
+    sep_tokens = estimate_tokens(separator)
+    packed = {}      # group -> [item texts], insertion order = rank order of each group's best item
+    used = 0
+
+    for item in ranked:
+        group = group_by(item) if group_by else None
+        cost = sep_tokens
+        if group not in packed and header:
+            cost += estimate_tokens(header(group)) + sep_tokens
+
+        text = truncate_to_tokens(render(item), max_item_tokens)
+        available = remaining - cost
+        tokens = estimate_tokens(text)
+        if tokens > available:
+            if available < CONTEXT_MIN_ITEM_TOKENS:
+                continue
+            text = truncate_to_tokens(text, available)
+            tokens = estimate_tokens(text)
+
+        packed.setdefault(group, []).append(text)
+        remaining -= cost + tokens
+        used += 1
+
+    blocks = []
+    for group, texts in packed.items():
+        if header:
+            blocks.append(header(group))
+        blocks.extend(texts)
+    text = separator.join(blocks)
+
+    return {
+        "text": text,
+        "tokens_used": estimate_tokens(text),
+        "budget": budget,
+        "items_used": used,
+        "items_dropped": len(ranked) - used,
+        "groups": [group for group in packed if group is not None],
+    }
+
+
+def context_report(*packs):
+    """Token usage summary for one or more packs, for API responses and logs"""
+    return {
+        "tokens_used": sum(pack["tokens_used"] for pack in packs),
+        "budget": sum(pack["budget"] for pack in packs),
+        "items_used": sum(pack["items_used"] for pack in packs),
+        "items_dropped": sum(pack["items_dropped"] for pack in packs),
+    }
@@ -3,9 +3,11 @@ from dotenv import load_dotenv
 load_dotenv()
 import time
 import random
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-import requests
 import re
+from cache_store import PersistentCache, make_cache_key
+from clova_client import post_json
 
 # Load rubric from Excel
 rubric_df = pd.read_excel("Criteria.xlsx")
@@ -40,14 +42,40 @@ ALLOWED_CATEGORIES = {
 
 SECTION_HEADERS = {"인적역량", "AI기술역량", "솔루션 역량"}
 
-def evaluate_answer(question, answer):
-    CLOVA_API_KEY = os.getenv("CLOVA_API_KEY")
+API_PATH = "/testapp/v2/tasks/bjlkpn9s/chat-completions"
+
+# Concurrency settings for batch scoring (the per-host cap lives in clova_client)
+EVALUATOR_MAX_CONCURRENCY = int(os.getenv("EVALUATOR_MAX_CONCURRENCY", "4"))
+EVALUATOR_TIMEOUT = float(os.getenv("EVALUATOR_TIMEOUT", "60"))
+
+SCORER_MODEL = "ft:tuning-1883-250519-111923-2qjqh"
+SCORER_PARAMS = {
+    "topP": 0.8,
+    "topK": 0,
+    "maxTokens": 10,
+    "temperature": 0.7,
+    "repeatPenalty": 5.0,
+    "includeAiFilters": True,
+    "stopBefore": [],
+}
+
+# Scores for unchanged (question, answer, rubric, model, params) tuples are reused across runs
+score_cache = PersistentCache(
+    "score_cache",
+    max_entries=int(os.getenv("SCORE_CACHE_MAX_ENTRIES", "50000")),
+    ttl_seconds=float(os.getenv("SCORE_CACHE_TTL_SECONDS", str(30 * 24 * 3600))),
+)
+
+def evaluate_answer(question, answer, timeout=EVALUATOR_TIMEOUT):
     REQUEST_ID = f"msp-evaluator-{random.randint(100000,999999)}"
-    API_URL = "https://clovastudio.stream.ntruss.com/testapp/v2/tasks/bjlkpn9s/chat-completions"
-    model = "ft:tuning-1883-250519-111923-2qjqh"
 
     rubric = rubric_lookup.get(question.strip(), "해당 질문에 대한 평가 기준이 명확하지 않습니다.")
 
+    cache_key = make_cache_key(question.strip(), answer, rubric, SCORER_MODEL, SCORER_PARAMS)
+    cached_score = score_cache.get(cache_key)
+    if cached_score is not None:
+        return cached_score
+
     system_prompt = (
         "당신은 Naver Cloud에서 클라우드 MSP 파트너사를 평가하는 모델입니다. 응답이 명확하고 신뢰할 수 있는 평가 기준을 따르되, 실무적으로 충분하다고 판단되는 응답에 대해서는 긍정적으로, 후한 점수로 평가하십시오."
         f"점수는 다음을 기준으로 공정하고 일관되게 부여해야 합니다:\n\n"
@@ -57,39 +85,57 @@ def evaluate_answer(question, answer):
 
     user_prompt = f"[질문] {question}\n[응답] {answer}\n점수만 숫자로 알려주세요. (1~5 중 하나) 최종적으로 점수를 매기기 전에 왜 그렇게 매겼는지 상세히 재고하나 *반드시 설명을 제외한 숫자 하나만* 기록해 주세요."
 
-    headers = {
-        "Authorization": f"Bearer {CLOVA_API_KEY}",
-        "X-NCP-CLOVASTUDIO-REQUEST-ID": REQUEST_ID,
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-    }
-
     body = {
-        "topP": 0.8,
-        "topK": 0,
-        "maxTokens": 10,
-        "temperature": 0.7,
-        "repeatPenalty": 5.0,
-        "includeAiFilters": True,
-        "stopBefore": [],
+        **SCORER_PARAMS,
         "messages": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
         ]
     }
 
-    response = requests.post(API_URL, json=body, headers=headers)
-    result = response.json()
+    result, _ = post_json(
+        API_PATH,
+        body,
+        request_id=REQUEST_ID,
+        headers={"Accept": "application/json"},
+        timeout=timeout,
+    )
     if "result" in result:
         message = result["result"]["message"]["content"].strip()
         match = re.search(r"\b([1-5])\b", message)
         if match:
-            return int(match.group(1))
+            score = int(match.group(1))
+            score_cache.set(cache_key, score)
+            return score
         else:
             return f"Unexpected content: {message}"
     else:
         return f"Error in API response: {result}"
 
+def evaluate_answers(pairs, max_concurrency=None, timeout=EVALUATOR_TIMEOUT):
+    """
+    Score (question, answer) pairs concurrently and return results in input order.
+    A failed call yields the raised exception in its slot so callers can decide the fallback.
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return []
+
+    workers = max(1, min(max_concurrency or EVALUATOR_MAX_CONCURRENCY, len(pairs)))
+
+    def score_one(pair):
+        question, answer = pair
+        try:
+            return evaluate_answer(question, answer, timeout=timeout)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="evaluator") as pool:
+        results = list(pool.map(score_one, pairs))
+
+    print(f"[SCORE CACHE] {score_cache.stats()}")
+    return results
+
 
 # --- Category summary functions ---
 def compute_category_scores_from_dataframe(df):
@@ -1,6 +1,6 @@
 import pandas as pd
 from fastapi import UploadFile
-from evaluator import evaluate_answer
+from evaluator import evaluate_answers
 from utils import fix_korean_encoding
 import io
 
@@ -49,28 +49,27 @@ def parse_excel_category_sheets(excel_bytes: bytes):
             print(f"[ERROR] Error parsing sheet '{sheet_name}': {e}")
             continue
 
-        # Evaluate each parsed item
+        # Evaluate all parsed items of the sheet as one concurrent batch
+        valid_items = [
+            item for item in parsed
+            if item.get("question", "").strip() and item.get("answer", "").strip()
+        ]
+        scores = evaluate_answers([(item["question"], item["answer"]) for item in valid_items])
+
         sheet_results = []
-        for item in parsed:
-            question = item.get("question", "")
-            answer = item.get("answer", "")
-            group = item.get("group", "")
-            
-            if not question or not answer or not question.strip() or not answer.strip():
-                continue
-                
-            try:
-                score = evaluate_answer(question, answer)
-                print(f"[DEBUG] Evaluated '{question[:30]}...' -> Score: {score}")
-            except Exception as e:
-                print(f"[ERROR] Failed to evaluate question '{question[:30]}...': {e}")
+        for item, score in zip(valid_items, scores):
+            question = item["question"]
+            if isinstance(score, Exception):
+                print(f"[ERROR] Failed to evaluate question '{question[:30]}...': {score}")
                 score = 3  # Default middle score instead of error
+            else:
+                print(f"[DEBUG] Evaluated '{question[:30]}...' -> Score: {score}")
 
             sheet_results.append({
                 "question": question,
-                "answer": answer,
+                "answer": item["answer"],
                 "score": score,
-                "group": group or sheet_name  # Use sheet name as fallback group
+                "group": item.get("group", "") or sheet_name  # Use sheet name as fallback group
             })
 
         if sheet_results:
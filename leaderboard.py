@@ -0,0 +1,283 @@
+import os
+from collections import defaultdict
+from functools import lru_cache
+import numpy as np
+import company_store
+from utils import numeric_score
+
+MAIN_CATEGORIES = ["인적역량", "AI기술역량", "솔루션 역량"]
+
+# "vectorized" aggregates every MSP in one grouped pass; "per_msp" reuses calculate_scores_from_metadatas
+LEADERBOARD_COMPUTE_MODE = os.getenv("LEADERBOARD_COMPUTE_MODE", "vectorized")
+
+# Enhanced group-to-category mapping based on your existing patterns
+GROUP_TO_CATEGORY_MAPPING = {
+    # Human Resources (인적역량)
+    "AI 전문 인력 구성": "인적역량",
+    "프로젝트 경험 및 성공 사례": "인적역량",
+    "지속적인 교육 및 학습": "인적역량",
+    "프로젝트 관리 및 커뮤니케이션": "인적역량",
+    "AI 윤리 및 책임 의식": "인적역량",
+
+    # AI Technology (AI기술역량)
+    "AI 기술 연구 능력": "AI기술역량",
+    "AI 모델 개발 능력": "AI기술역량",
+    "AI 플랫폼 및 인프라 구축 능력": "AI기술역량",
+    "데이터 처리 및 분석 능력": "AI기술역량",
+    "AI 기술의 융합 및 활용 능력": "AI기술역량",
+    "AI 기술의 특허 및 인증 보유 현황": "AI기술역량",
+
+    # Solution (솔루션 역량)
+    "다양성 및 전문성": "솔루션 역량",
+    "안정성": "솔루션 역량",
+    "확장성 및 유연성": "솔루션 역량",
+    "사용자 편의성": "솔루션 역량",
+    "보안성": "솔루션 역량",
+    "기술 지원 및 유지보수": "솔루션 역량",
+    "차별성 및 경쟁력": "솔루션 역량",
+    "개발 로드맵 및 향후 계획": "솔루션 역량"
+}
+
+@lru_cache(maxsize=4096)
+def map_group_to_main_category(group_name: str):
+    """Map a group name to its main category, falling back to keyword matching; None if unmatched"""
+    main_category = GROUP_TO_CATEGORY_MAPPING.get(group_name)
+    if main_category:
+        return main_category
+
+    group_lower = group_name.lower()
+    if any(keyword in group_lower for keyword in ["인력", "교육", "학습", "관리", "커뮤니케이션", "윤리", "프로젝트"]):
+        return "인적역량"
+    elif any(keyword in group_lower for keyword in ["ai", "기술", "모델", "플랫폼", "인프라", "데이터", "융합", "특허", "연구"]):
+        return "AI기술역량"
+    elif any(keyword in group_lower for keyword in ["솔루션", "다양성", "안정성", "확장성", "편의성", "보안", "지원", "차별성", "로드맵"]):
+        return "솔루션 역량"
+    return None
+
+def manual_category_calculation(grouped_data, total_avg):
+    """Fallback manual calculation if the existing logic fails"""
+
+    # Aggregate scores by main category
+    category_data = {cat: [] for cat in MAIN_CATEGORIES}
+
+    for group_name, items in grouped_data.items():
+        main_category = map_group_to_main_category(group_name)
+
+        # Add scores to appropriate category
+        if main_category and main_category in category_data:
+            for item in items:
+                category_data[main_category].append(item["score"])
+
+    # Calculate averages
+    category_scores = {}
+    for cat in MAIN_CATEGORIES:
+        if category_data[cat]:
+            category_scores[cat] = round(sum(category_data[cat]) / len(category_data[cat]), 2)
+        else:
+            # Use total average as fallback
+            category_scores[cat] = total_avg
+
+    return category_scores
+
+def calculate_scores_from_metadatas(metadatas, msp_name: str = ""):
+    """
+    Calculate total and main-category scores for one MSP from its chunk metadatas,
+    using the same logic as the upload summary
+    """
+    if not metadatas:
+        return {"total_score": 0, "category_scores": {cat: 0 for cat in MAIN_CATEGORIES}}
+
+    # Organize data by group (similar to your upload logic)
+    grouped_data = {}
+    all_scores = []
+
+    for meta in metadatas:
+        question = meta.get("question", "")
+        answer = meta.get("answer", "")
+        score = numeric_score(meta.get("score"))
+        group = meta.get("group", "Unknown").strip()
+
+        if not question or not answer or score is None:
+            continue
+
+        all_scores.append(score)
+
+        if group not in grouped_data:
+            grouped_data[group] = []
+
+        grouped_data[group].append({
+            "question": question,
+            "answer": answer,
+            "score": score
+        })
+
+    # Calculate total average
+    total_avg = sum(all_scores) / len(all_scores) if all_scores else 0
+
+    category_scores = {}
+    try:
+        # Use manual calculation since we're dealing with ChromaDB data
+        category_scores = manual_category_calculation(grouped_data, total_avg)
+    except Exception as e:
+        print(f"[WARNING] Manual calculation failed for {msp_name}: {e}")
+        # Final fallback: use total average for all categories
+        for cat in MAIN_CATEGORIES:
+            category_scores[cat] = total_avg
+
+    # Ensure all main categories are present
+    for cat in MAIN_CATEGORIES:
+        if cat not in category_scores:
+            category_scores[cat] = total_avg
+
+    return {
+        "total_score": round(total_avg, 2),
+        "category_scores": category_scores
+    }
+
+def calculate_msp_category_scores(collection, msp_name: str):
+    """Calculate category scores for a specific MSP straight from the vector store"""
+    try:
+        results = collection.get(
+            where={"msp_name": msp_name},
+            include=["metadatas"]
+        )
+        return calculate_scores_from_metadatas(results["metadatas"], msp_name)
+    except Exception as e:
+        print(f"[ERROR] Failed to calculate scores for {msp_name}: {e}")
+        return {"total_score": 0, "category_scores": {cat: 0 for cat in MAIN_CATEGORIES}}
+
+def compute_leaderboard_per_msp(metadatas):
+    """Reference implementation: group metadatas by MSP and score each one separately"""
+    metadatas_by_msp = defaultdict(list)
+    for meta in metadatas:
+        msp_name = meta.get("msp_name")
+        if msp_name:
+            metadatas_by_msp[msp_name].append(meta)
+
+    rows = []
+    for msp_name, msp_metadatas in metadatas_by_msp.items():
+        try:
+            scores = calculate_scores_from_metadatas(msp_metadatas, msp_name)
+        except Exception as e:
+            # One company's bad data must not take down the whole board
+            print(f"[ERROR] Failed to calculate scores for {msp_name}: {e}")
+            scores = {"total_score": 0, "category_scores": {cat: 0 for cat in MAIN_CATEGORIES}}
+        rows.append({
+            "name": msp_name,
+            "total_score": scores["total_score"],
+            "category_scores": scores["category_scores"]
+        })
+    return rows
+
+def compute_leaderboard(metadatas):
+    """
+    Compute every MSP's total and main-category averages in one grouped aggregation.
+    A single pass turns the metadata into columns of categorical codes (msp, category)
+    and scores; sums/counts then come from np.bincount. Results match calculate_scores_from_metadatas.
+    """
+    msp_index = {}
+    group_category = {}
+    category_index = {cat: i for i, cat in enumerate(MAIN_CATEGORIES)}
+
+    msp_codes = []
+    category_codes = []
+    scores = []
+
+    for meta in metadatas:
+        msp_name = meta.get("msp_name")
+        if not msp_name:
+            continue
+        msp_code = msp_index.setdefault(msp_name, len(msp_index))
+        # Filter non-numeric scores before vectorizing, exactly like the per-MSP path
+        score = numeric_score(meta.get("score"))
+        if not meta.get("question", "") or not meta.get("answer", "") or score is None:
+            continue
+
+        # Map each distinct group to its category code once
+        group = meta.get("group", "Unknown")
+        category_code = group_category.get(group)
+        if category_code is None:
+            category_code = category_index.get(map_group_to_main_category(group.strip()), -1)
+            group_category[group] = category_code
+
+        msp_codes.append(msp_code)
+        category_codes.append(category_code)
+        scores.append(score)
+
+    if not msp_index:
+        return []
+
+    n_msp = len(msp_index)
+    n_cat = len(MAIN_CATEGORIES)
+    msp_codes = np.array(msp_codes, dtype=np.int64)
+    category_codes = np.array(category_codes, dtype=np.int64)
+    scores = np.array(scores, dtype=np.float64)
+
+    total_sum = np.bincount(msp_codes, weights=scores, minlength=n_msp)
+    total_count = np.bincount(msp_codes, minlength=n_msp)
+
+    mapped = category_codes >= 0
+    cell = msp_codes[mapped] * n_cat + category_codes[mapped]
+    category_sum = np.bincount(cell, weights=scores[mapped], minlength=n_msp * n_cat).reshape(n_msp, n_cat)
+    category_count = np.bincount(cell, minlength=n_msp * n_cat).reshape(n_msp, n_cat)
+
+    total_avg = np.divide(total_sum, total_count, out=np.zeros(n_msp), where=total_count > 0)
+    category_avg = np.divide(category_sum, category_count, out=np.zeros((n_msp, n_cat)), where=category_count > 0)
+
+    rows = []
+    for msp_name, i in msp_index.items():
+        avg = float(total_avg[i]) if total_count[i] else 0
+        category_scores = {}
+        for j, cat in enumerate(MAIN_CATEGORIES):
+            # Use total average as fallback for categories without scored rows
+            category_scores[cat] = round(float(category_avg[i, j]), 2) if category_count[i, j] else avg
+        rows.append({
+            "name": msp_name,
+            "total_score": round(avg, 2),
+            "category_scores": category_scores
+        })
+    return rows
+
+def rebuild_leaderboard(collection, mode: str = None):
+    """Recompute every MSP's scores from a single metadata scan and replace the materialized table"""
+    mode = mode or LEADERBOARD_COMPUTE_MODE
+    version = company_store.get_store_version()
+    results = collection.get(include=["metadatas"])
+
+    if mode == "per_msp":
+        rows = compute_leaderboard_per_msp(results["metadatas"])
+    else:
+        rows = compute_leaderboard(results["metadatas"])
+
+    company_store.replace_leaderboard(rows)
+    company_store.set_meta("leaderboard_version", version)
+    print(f"[DEBUG] Rebuilt leaderboard for {len(rows)} MSPs at store version {version} ({mode})")
+
+def refresh_company(collection, msp_name: str):
+    """
+    Write hook: recompute one MSP's row after its chunks changed.
+    Only applied when the table was current before this write; otherwise the next read rebuilds it.
+    """
+    version = company_store.get_store_version()
+    if msp_name is None or company_store.get_meta("leaderboard_version") != str(version - 1):
+        return
+
+    results = collection.get(where={"msp_name": msp_name}, include=["metadatas"])
+    if results["metadatas"]:
+        try:
+            scores = calculate_scores_from_metadatas(results["metadatas"], msp_name)
+        except Exception as e:
+            # Leave the table marked stale; the next read rebuilds it
+            print(f"[ERROR] Failed to refresh leaderboard row for {msp_name}: {e}")
+            return
+        company_store.upsert_leaderboard_row(msp_name, scores["total_score"], scores["category_scores"])
+    else:
+        company_store.delete_leaderboard_row(msp_name)
+    company_store.set_meta("leaderboard_version", version)
+
+def get_leaderboard(collection):
+    """Return (rows sorted by total score, store version), rebuilding the table first if it is stale"""
+    version = company_store.get_store_version()
+    if company_store.get_meta("leaderboard_version") != str(version):
+        rebuild_leaderboard(collection)
+    return company_store.list_leaderboard(), version
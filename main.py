@@ -1,8 +1,8 @@
 import os
-import signal
 import time
+import httpx
 from sheets_reader import load_evaluation_data, update_scores_to_sheet, connect_to_sheets
-from evaluator import evaluate_answer, append_category_scores_to_sheet
+from evaluator import evaluate_answers, append_category_scores_to_sheet
 
 ROW_MAPPING = {
     "AI 전문 인력 구성": 3,
@@ -30,14 +30,6 @@ ROW_MAPPING = {
     "솔루션 역량 총점": 30
 }
 
-class TimeoutException(Exception):
-    pass
-
-def handler(signum, frame):
-    raise TimeoutException("Timed out")
-
-signal.signal(signal.SIGALRM, handler)
-
 target_sheets = os.getenv("TARGET_SHEET_NAMES", "Test").split(",")
 
 all_summaries = {}
@@ -47,6 +39,7 @@ for sheet_name in target_sheets:
     print(f"\nProcessing sheet: {sheet_name}", flush=True)
     df, sheet = load_evaluation_data(sheet_name=sheet_name)
     scores = []
+    pending = []  # (position in scores, row number, question, answer)
 
     for idx, row in df.iterrows():
         interview_result = str(row.get("Interview Result", "")).strip()
@@ -58,21 +51,22 @@ for sheet_name in target_sheets:
             scores.append(current_level)
             continue
 
-        question = row["Key Questions"]
-        answer = interview_result
-        print(f"Evaluating row {idx+1}", flush=True)
-        try:
-            signal.alarm(60)
-            score = evaluate_answer(question, answer)
-            signal.alarm(0)
-            print(f"Done row {idx+1} → {score}", flush=True)
-        except TimeoutException:
-            print(f"Timeout for row {idx+1}", flush=True)
+        pending.append((len(scores), idx + 1, row["Key Questions"], interview_result))
+        scores.append(None)
+
+    print(f"Evaluating {len(pending)} rows", flush=True)
+    results = evaluate_answers([(question, answer) for _, _, question, answer in pending])
+
+    for (pos, row_num, _, _), score in zip(pending, results):
+        if isinstance(score, httpx.TimeoutException):
+            print(f"Timeout for row {row_num}", flush=True)
             score = "Timeout"
-        except Exception as e:
-            print(f"Exception at row {idx+1}: {e}", flush=True)
+        elif isinstance(score, Exception):
+            print(f"Exception at row {row_num}: {score}", flush=True)
             score = "Error"
-        scores.append(score)
+        else:
+            print(f"Done row {row_num} → {score}", flush=True)
+        scores[pos] = score
 
     df["Present Lv."] = scores
     update_scores_to_sheet(df, sheet)
@@ -4,10 +4,12 @@
 
 import json
 import sys
-import urllib.parse
-import urllib.request
 import os
 import re
+import time
+import threading
+from collections import OrderedDict
+import httpx
 from dotenv import load_dotenv
 
 # 환경변수 로드
@@ -23,24 +25,31 @@ def clean_html_tags(text: str) -> str:
     text = text.replace('&lt;', '<').replace('&gt;', '>')
     return text.strip()
 
-def extract_company_name_simple(question: str) -> str:
-    """간단한 회사명 추출"""
-    import re
-    
-    patterns = [
-        r'([가-힣A-Za-z0-9\s]+)에\s*대해',
-        r'([가-힣A-Za-z0-9\s]+)의\s*뉴스',
-        r'([가-힣A-Za-z0-9\s]+)\s*뉴스',
-        r'([가-힣A-Za-z0-9\s]+)\s*최근',
-        r'([가-힣A-Za-z0-9\s]+)\s*소식'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, question)
+# 질문에서 회사명을 잡아내는 패턴 (msp_core의 로컬 회사명 추출기도 사용)
+COMPANY_NAME_PATTERNS = [
+    re.compile(r'([가-힣A-Za-z0-9\s]+)에\s*대해'),
+    re.compile(r'([가-힣A-Za-z0-9\s]+)의\s*뉴스'),
+    re.compile(r'([가-힣A-Za-z0-9\s]+)\s*뉴스'),
+    re.compile(r'([가-힣A-Za-z0-9\s]+)\s*최근'),
+    re.compile(r'([가-힣A-Za-z0-9\s]+)\s*소식')
+]
+COMPANY_NAME_STOPWORDS = ['회사', '기업', '그', '이', '그것', '뉴스', '소식']
+
+def extract_company_name_by_pattern(question: str):
+    """패턴 기반 회사명 추출 (일치하는 패턴이 없으면 None)"""
+    for pattern in COMPANY_NAME_PATTERNS:
+        match = pattern.search(question)
         if match:
             company_name = match.group(1).strip()
-            if company_name not in ['회사', '기업', '그', '이', '그것', '뉴스', '소식']:
+            if company_name not in COMPANY_NAME_STOPWORDS:
                 return company_name
+    return None
+
+def extract_company_name_simple(question: str) -> str:
+    """간단한 회사명 추출"""
+    company_name = extract_company_name_by_pattern(question)
+    if company_name:
+        return company_name
     
     words = question.split()
     for word in words:
@@ -49,40 +58,170 @@ def extract_company_name_simple(question: str) -> str:
     
     return question.strip()
 
+# 검색 API 클라이언트 (프로세스 내에서 재사용되는 커넥션 풀)
+NAVER_SEARCH_BASE_URL = "https://openapi.naver.com/v1/search"
+NAVER_SEARCH_TIMEOUT = float(os.getenv("NAVER_SEARCH_TIMEOUT", "10"))
+NAVER_SEARCH_POOL_SIZE = int(os.getenv("NAVER_SEARCH_POOL_SIZE", "10"))
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client() -> httpx.Client:
+    """프로세스 공용 httpx 클라이언트 (최초 호출 시 생성)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    base_url=NAVER_SEARCH_BASE_URL,
+                    limits=httpx.Limits(
+                        max_connections=NAVER_SEARCH_POOL_SIZE,
+                        max_keepalive_connections=NAVER_SEARCH_POOL_SIZE,
+                    ),
+                    timeout=NAVER_SEARCH_TIMEOUT,
+                )
+    return _client
+
+# 검색 결과 캐시 (뉴스 ~15분, 웹 ~24시간 TTL, 만료 후에도 일정 시간은 이전 결과를 반환하며 백그라운드 갱신)
+NAVER_NEWS_CACHE_TTL = float(os.getenv("NAVER_NEWS_CACHE_TTL", "900"))
+NAVER_WEB_CACHE_TTL = float(os.getenv("NAVER_WEB_CACHE_TTL", "86400"))
+NAVER_SEARCH_CACHE_MAX_STALE = float(os.getenv("NAVER_SEARCH_CACHE_MAX_STALE", "3600"))
+NAVER_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("NAVER_SEARCH_CACHE_MAX_ENTRIES", "1000"))
+
+class SearchResultCache:
+    """TTL + LRU 메모리 캐시, stale-while-revalidate 지원"""
+
+    def __init__(self, max_entries: int, max_stale: float):
+        self.max_entries = max_entries
+        self.max_stale = max_stale
+        self._entries = OrderedDict()   # key -> (value, fetched_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get_or_fetch(self, key, ttl: float, fetch):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, fetched_at = entry
+                age = now - fetched_at
+                if age <= ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                if age <= ttl + self.max_stale:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._revalidate, args=(key, fetch), daemon=True).start()
+                    return value
+            self.misses += 1
+
+        value = fetch()
+        self._store(key, value)
+        return value
+
+    def _revalidate(self, key, fetch):
+        try:
+            self._store(key, fetch())
+        except Exception as e:
+            print(f"검색 캐시 갱신 실패 {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries)
+            }
+
+search_cache = SearchResultCache(NAVER_SEARCH_CACHE_MAX_ENTRIES, NAVER_SEARCH_CACHE_MAX_STALE)
+SEARCH_CACHE_TTLS = {"news": NAVER_NEWS_CACHE_TTL, "webkr": NAVER_WEB_CACHE_TTL}
+
+def _fetch_search(endpoint: str, query: str, display: int, sort: str) -> dict:
+    response = get_client().get(
+        f"/{endpoint}.json",
+        params={"query": query, "display": display, "sort": sort},
+        headers={
+            "X-Naver-Client-Id": os.getenv("NAVER_CLIENT_ID") or "",
+            "X-Naver-Client-Secret": os.getenv("NAVER_CLIENT_SECRET") or ""
+        },
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f"네이버 API 오류: {response.status_code}")
+    return response.json()
+
+def search_api(endpoint: str, query: str, display: int, sort: str = "sim") -> dict:
+    """네이버 검색 Open API 호출 (endpoint: news, webkr) - 원본 JSON 반환, 실패 시 예외 (결과는 캐시됨)"""
+    ttl = SEARCH_CACHE_TTLS.get(endpoint, NAVER_NEWS_CACHE_TTL)
+    return search_cache.get_or_fetch(
+        (query, endpoint, display, sort),
+        ttl,
+        lambda: _fetch_search(endpoint, query, display, sort)
+    )
+
+def search_news_items(query: str, max_results: int = 10) -> dict:
+    """네이버 뉴스 검색 - 정리된 항목 반환 {"items": [...], "total": n}"""
+    data = search_api("news", query, max_results)
+    items = []
+    for item in data.get("items", []):
+        items.append({
+            "title": clean_html_tags(item.get("title", "")),
+            "description": clean_html_tags(item.get("description", "")),
+            "pubDate": item.get("pubDate", "")[:10] if item.get("pubDate") else "날짜 없음",
+            "link": item.get("originallink", item.get("link", ""))
+        })
+    return {"items": items, "total": data.get("total", 0)}
+
+def search_web_items(query: str, max_results: int = 5) -> dict:
+    """네이버 웹 검색 - 정리된 항목 반환 {"items": [...], "total": n}"""
+    data = search_api("webkr", query, max_results)
+    items = []
+    for item in data.get("items", []):
+        items.append({
+            "title": clean_html_tags(item.get("title", "")),
+            "description": clean_html_tags(item.get("description", "")),
+            "link": item.get("link", "")
+        })
+    return {"items": items, "total": data.get("total", 0)}
+
 def naver_news_search(query: str, max_results: int = 10):
-    """네이버 뉴스 검색"""
+    """네이버 뉴스 검색 (CLI용 텍스트 포맷)"""
     try:
-        encoded_query = urllib.parse.quote(query)
-        url = f"https://openapi.naver.com/v1/search/news.json?query={encoded_query}&display={max_results}&sort=sim"
-        
-        headers = {
-            "X-Naver-Client-Id": os.getenv("NAVER_CLIENT_ID"),
-            "X-Naver-Client-Secret": os.getenv("NAVER_CLIENT_SECRET")
-        }
+        data = search_news_items(query, max_results)
         
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req) as response:
-            if response.status != 200:
-                return f"네이버 API 오류: {response.status}"
-            
-            data = json.loads(response.read().decode("utf-8"))
-        
-        if "items" not in data or not data["items"]:
+        if not data["items"]:
             return f"'{query}'에 대한 뉴스 기사를 찾을 수 없습니다."
         
         # 결과 포맷팅 (기존 msp_core와 호환)
         results = []
         for i, item in enumerate(data["items"], 1):
-            title = clean_html_tags(item.get("title", ""))
-            description = clean_html_tags(item.get("description", ""))
-            pub_date = item.get("pubDate", "")[:10] if item.get("pubDate") else "날짜 없음"
-            link = item.get("originallink", item.get("link", ""))
-            
             result_text = f"""📰 뉴스 {i}
-제목: {title}
-날짜: {pub_date}
-세부내용: {description}
-링크: {link}
+제목: {item['title']}
+날짜: {item['pubDate']}
+세부내용: {item['description']}
+링크: {item['link']}
 """
             results.append(result_text)
         
@@ -91,7 +230,7 @@ def naver_news_search(query: str, max_results: int = 10):
 {chr(10).join(results)}
 
 검색 통계:
-- 총 검색 결과: {data.get('total', 0)}건
+- 총 검색 결과: {data['total']}건
 - 표시된 결과: {len(data['items'])}건"""
         
         return final_result
@@ -100,37 +239,20 @@ def naver_news_search(query: str, max_results: int = 10):
         return f"뉴스 검색 중 오류 발생: {str(e)}"
 
 def naver_web_search(query: str, max_results: int = 5):
-    """네이버 웹 검색"""
+    """네이버 웹 검색 (CLI용 텍스트 포맷)"""
     try:
-        encoded_query = urllib.parse.quote(query)
-        url = f"https://openapi.naver.com/v1/search/webkr.json?query={encoded_query}&display={max_results}&sort=sim"
-        
-        headers = {
-            "X-Naver-Client-Id": os.getenv("NAVER_CLIENT_ID"),
-            "X-Naver-Client-Secret": os.getenv("NAVER_CLIENT_SECRET")
-        }
-        
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req) as response:
-            if response.status != 200:
-                return f"네이버 API 오류: {response.status}"
-            
-            data = json.loads(response.read().decode("utf-8"))
+        data = search_web_items(query, max_results)
         
-        if "items" not in data or not data["items"]:
+        if not data["items"]:
             return f"'{query}'에 대한 웹 문서를 찾을 수 없습니다."
         
         # 결과 포맷팅
         results = []
         for i, item in enumerate(data["items"], 1):
-            title = clean_html_tags(item.get("title", ""))
-            description = clean_html_tags(item.get("description", ""))
-            link = item.get("link", "")
-            
             result_text = f"""🌐 웹문서 {i}
-제목: {title}
-요약: {description}
-링크: {link}
+제목: {item['title']}
+요약: {item['description']}
+링크: {item['link']}
 """
             results.append(result_text)
         
@@ -139,7 +261,7 @@ def naver_web_search(query: str, max_results: int = 5):
 {chr(10).join(results)}
 
 검색 통계:
-- 총 검색 결과: {data.get('total', 0)}건
+- 총 검색 결과: {data['total']}건
 - 표시된 결과: {len(data['items'])}건"""
         
         return final_result
@@ -5,19 +5,33 @@ from typing import Any
 import requests
 import json
 import uuid
-from difflib import get_close_matches
+import time
+import threading
+import contextlib
+import contextvars
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from vector_writer import clova_embedding
+from msp_name_index import MspNameIndex
+from bm25_index import Bm25Index
+from retriever import Retriever
+from context_builder import pack_evidence, context_budget, context_report
+from utils import run_blocking
 import os
-import chromadb
-from chromadb import PersistentClient
+from vector_store import collection, register_write_hook, scores_numeric
 
-# Embedding and collection setup
+# Embedding and collection setup (repeated questions hit the shared embedding cache)
 def query_embed(text: str):
     return clova_embedding(text)
 
-CHROMA_PATH = os.path.abspath("chroma_store")
-client = PersistentClient(path=CHROMA_PATH)
-collection = client.get_or_create_collection("msp_chunks")
+# Distinct company names for fuzzy name resolution, kept current on ingest/delete
+msp_name_index = MspNameIndex(collection)
+register_write_hook(msp_name_index.refresh)
+
+# Lexical index fused with vector search by the retriever; filters are pushed down into both
+bm25_index = Bm25Index(collection)
+register_write_hook(bm25_index.refresh)
+retriever = Retriever(collection, query_embed, bm25_index, scores_numeric=scores_numeric)
 
 import anthropic
 import os
@@ -25,32 +39,57 @@ from collections import defaultdict
 import traceback
 from fastapi import HTTPException
 
-def run_msp_recommendation(question: str, min_score: int):
-    """
-    Sophisticated MSP recommendation leveraging Claude's analytical capabilities
-    """
+# --- Claude generation plans ---
+# prepare_* functions do retrieval and prompt assembly and return a plan:
+#   result      - final response when no generation is needed (early exit), else None
+#   msp_name    - resolved company, if any
+#   evidence    - retrieved items to show before the answer
+#   claude      - kwargs for client.messages.create / messages.stream
+#   finalize    - turns the raw answer text into the route's response dict
+# run_claude_plan generates in one call; stream_claude_plan yields tokens for SSE routes.
+def run_claude_plan(plan: dict):
+    if plan.get("result") is not None:
+        return plan["result"]
     try:
-        query_vector = query_embed(question)
-        query_results = collection.query(
-            query_embeddings=[query_vector],
-            n_results=20
-        )
+        client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        response = client.messages.create(**plan["claude"])
+        return plan["finalize"](response.content[0].text.strip())
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"{plan['error_detail']}: {str(e)}")
+
+def stream_claude_plan(plan: dict):
+    """Yield ("token", text) for each answer delta, then ("final", response dict)"""
+    if plan.get("result") is not None:
+        yield "final", plan["result"]
+        return
+    client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    parts = []
+    with client.messages.stream(**plan["claude"]) as stream:
+        for text in stream.text_stream:
+            parts.append(text)
+            yield "token", text
+    yield "final", plan["finalize"]("".join(parts).strip())
+
+def prepare_msp_recommendation(question: str, min_score: int):
+    """Retrieval and prompt assembly for run_msp_recommendation; returns a Claude generation plan"""
+    try:
+        hits = retriever.search(question, k=20, min_score=min_score)
         
         grouped_chunks = defaultdict(list)
-        for meta in query_results["metadatas"][0]:
-            if not isinstance(meta.get("answer"), str) or not meta["answer"].strip():
-                continue
-            if meta["score"] is not None and int(meta["score"]) >= min_score:
-                grouped_chunks[meta["msp_name"]].append({
-                    "question": meta['question'],
-                    "answer": meta['answer'],
-                    "score": meta['score'],
-                    "category": meta.get('category', '미분류'),
-                    "group": meta.get('group', '기타')
-                })
+        for hit in hits:
+            grouped_chunks[hit.msp_name].append({
+                "msp_name": hit.msp_name,
+                "question": hit.question,
+                "answer": hit.answer,
+                "score": hit.score,
+                "category": hit.category,
+                "group": hit.group,
+                "relevance": hit.relevance
+            })
 
         if not grouped_chunks:
-            return {"answer": "해당 조건에 맞는 평가 데이터를 찾을 수 없습니다."}
+            return {"result": {"answer": "해당 조건에 맞는 평가 데이터를 찾을 수 없습니다."}}
 
         # Enhanced analytics for comprehensive reasoning
         company_analytics = {}
@@ -99,15 +138,11 @@ def run_msp_recommendation(question: str, min_score: int):
             
             company_analytics[msp] = analytics
 
-        # Create rich context for Claude's reasoning
-        analysis_context = []
-        
-        for msp, qa_list in grouped_chunks.items():
+        # Create rich context for Claude's reasoning: company blocks only for companies whose
+        # evidence makes it into the token budget, most relevant company first
+        def company_header(msp):
             analytics = company_analytics[msp]
-            sorted_qa = sorted(qa_list, key=lambda x: (x['score'], len(x['answer'])), reverse=True)
-            top_evidence = sorted_qa[:6]
-            
-            company_block = f"""
+            return f"""
 === {msp} 종합 분석 ===
 전체 평균: {analytics['overall_avg']}/5점 | 응답 수: {analytics['evidence_quality']['total_responses']}개
 
@@ -128,14 +163,18 @@ def run_msp_recommendation(question: str, min_score: int):
 - 상세 답변: {analytics['evidence_quality']['detailed_responses']}/{analytics['evidence_quality']['total_responses']}개
 - 구체적 사례/수치: {analytics['evidence_quality']['specific_examples']}/{analytics['evidence_quality']['total_responses']}개
 
-핵심 근거 자료:
-{chr(10).join([f"[{qa['score']}점] {qa['category']} | Q: {qa['question'][:60]}{'...' if len(qa['question']) > 60 else ''}" + 
-              f"{chr(10)}    A: {qa['answer'][:200]}{'...' if len(qa['answer']) > 200 else ''}"
-              for qa in top_evidence])}
-"""
-            analysis_context.append(company_block)
+핵심 근거 자료:"""
 
-        full_context = "\n".join(analysis_context)
+        context_pack = pack_evidence(
+            [qa for qa_list in grouped_chunks.values() for qa in qa_list],
+            context_budget("claude"),
+            render=lambda qa: f"[{qa['score']}점] {qa['category']} | Q: {qa['question']}{chr(10)}    A: {qa['answer']}",
+            group_by=lambda qa: qa["msp_name"],
+            header=company_header
+        )
+        full_context = context_pack["text"]
+        print(f"🧮 Recommendation context: {context_pack['tokens_used']}/{context_pack['budget']} tokens, "
+              f"{context_pack['items_used']} evidence items from {len(context_pack['groups'])} companies")
         
         # Enhanced prompt focused on targeted recommendation with clear reasoning
         prompt = f"""당신은 MSP 전문가입니다. 다음 평가 데이터를 바탕으로 사용자 요구사항에 맞는 회사를 추천해주세요.
@@ -235,22 +274,7 @@ def run_msp_recommendation(question: str, min_score: int):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Vector search failed: {str(e)}")
 
-    try:
-        client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-        
-        response = client.messages.create(
-            model="claude-3-haiku-20240307",
-            max_tokens=2000,  # Increased for comprehensive reasoning
-            temperature=0.1,   # Very low for consistent, analytical reasoning
-            system="당신은 클라우드 및 MSP 선정 분야의 최고 수준 컨설턴트입니다. 데이터 기반의 논리적 분석과 실무적 통찰력을 겸비하여, 고객이 최적의 의사결정을 할 수 있도록 구조화되고 설득력 있는 추천을 제공합니다. 추천의 투명성을 위해 분석 과정과 논리적 근거를 명확히 제시하며, 추상적 표현보다는 구체적 근거와 실질적 가치에 집중합니다.",
-            messages=[{
-                "role": "user", 
-                "content": prompt
-            }]
-        )
-        
-        answer = response.content[0].text.strip()
-        
+    def finalize(answer):
         # Enhanced post-processing for consistency
         professional_terms = {
             "설루션": "솔루션",
@@ -265,7 +289,7 @@ def run_msp_recommendation(question: str, min_score: int):
         
         return {
             "answer": answer,
-            "evidence": query_results["metadatas"][0],
+            "evidence": [hit.metadata for hit in hits],
             "model_used": "claude-3-haiku-enhanced-reasoning",
             "analysis_quality": "comprehensive_analytical_with_reasoning",
             "companies_analyzed": len(grouped_chunks),
@@ -277,12 +301,34 @@ def run_msp_recommendation(question: str, min_score: int):
                 "ranking_logic": True,
                 "confidence_assessment": True,
                 "excluded_companies_rationale": True
-            }
+            },
+            "context": context_report(context_pack)
         }
-        
-    except Exception as e:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Claude API error: {str(e)}")
+
+    return {
+        "result": None,
+        "msp_name": None,
+        "evidence": [hit.metadata for hit in hits],
+        "claude": dict(
+            model="claude-3-haiku-20240307",
+            max_tokens=2000,  # Increased for comprehensive reasoning
+            temperature=0.1,   # Very low for consistent, analytical reasoning
+            system="당신은 클라우드 및 MSP 선정 분야의 최고 수준 컨설턴트입니다. 데이터 기반의 논리적 분석과 실무적 통찰력을 겸비하여, 고객이 최적의 의사결정을 할 수 있도록 구조화되고 설득력 있는 추천을 제공합니다. 추천의 투명성을 위해 분석 과정과 논리적 근거를 명확히 제시하며, 추상적 표현보다는 구체적 근거와 실질적 가치에 집중합니다.",
+            messages=[{
+                "role": "user", 
+                "content": prompt
+            }]
+        ),
+        "finalize": finalize,
+        "error_detail": "Claude API error"
+    }
+
+def run_msp_recommendation(question: str, min_score: int):
+    """
+    Sophisticated MSP recommendation leveraging Claude's analytical capabilities
+    """
+    return run_claude_plan(prepare_msp_recommendation(question, min_score))
+
     
 def run_msp_recommendation_clova(question: str, min_score: int):
     """
@@ -294,19 +340,12 @@ def run_msp_recommendation_clova(question: str, min_score: int):
     import json
 
     try:
-        query_vector = query_embed(question)
-        query_results = collection.query(
-            query_embeddings=[query_vector],
-            n_results=10
-        )
+        hits = retriever.search(question, k=10, min_score=min_score)
         grouped_chunks = defaultdict(list)
-        for meta in query_results["metadatas"][0]:
-            if not isinstance(meta.get("answer"), str) or not meta["answer"].strip():
-                continue
-            if meta["score"] is not None and int(meta["score"]) >= min_score:
-                grouped_chunks[meta["msp_name"]].append(
-                    f"Q: {meta['question']}\nA: {meta['answer']} (score: {meta['score']})"
-                )
+        for hit in hits:
+            grouped_chunks[hit.msp_name].append(
+                f"Q: {hit.question}\nA: {hit.answer} (score: {hit.score})"
+            )
 
         if not grouped_chunks:
             return {"answer": "해당 조건에 맞는 평가 데이터를 찾을 수 없습니다."}
@@ -371,7 +410,7 @@ def run_msp_recommendation_clova(question: str, min_score: int):
         else:
             answer = clova_response.choices[0].message.content.strip()
         answer = answer.replace("설루션", "솔루션")
-        return {"answer": answer, "raw": clova_response.model_dump(), "evidence": query_results["metadatas"][0]}
+        return {"answer": answer, "raw": clova_response.model_dump(), "evidence": [hit.metadata for hit in hits]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"HyperCLOVA error: {str(e)}")
     
@@ -384,21 +423,12 @@ def run_msp_information_summary(question: str):
     query = question
     msp_name = extract_msp_name(question)
 
-    all_results = collection.get(include=["metadatas"])
-    all_msp_names = [meta.get("msp_name", "") for meta in all_results["metadatas"] if meta.get("msp_name")]
-
-    matches = get_close_matches(msp_name, all_msp_names, n=1, cutoff=0.6)
-    if not matches:
+    best_match = msp_name_index.best_match(msp_name, cutoff=0.6)
+    if not best_match:
         return {"answer": "질문하신 회사명을 인식하지 못했습니다. 다시 시도해 주세요.", "advanced": False}
-    best_match = matches[0]
 
     try:
-        query_vector = query_embed(question)
-        query_results = collection.query(
-            query_embeddings=[query_vector],
-            n_results=8
-        )
-        filtered_chunks = [c for c in query_results["metadatas"][0] if c.get("answer") and c.get("question") and c.get("msp_name") == best_match]
+        filtered_chunks = [hit.metadata for hit in retriever.search(question, k=8, msp_name=best_match)]
         if not filtered_chunks:
             return {"answer": "관련된 정보를 찾을 수 없습니다.", "advanced": False}
 
@@ -448,10 +478,8 @@ def run_msp_information_summary(question: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"HyperCLOVA error: {str(e)}")
     
-def run_msp_information_summary_claude(question: str):
-    """
-    Enhanced information summary leveraging Claude's analytical depth
-    """
+def prepare_msp_information_summary_claude(question: str):
+    """Company resolution, retrieval and prompt assembly for run_msp_information_summary_claude"""
     import traceback
     import anthropic
     import os
@@ -460,21 +488,13 @@ def run_msp_information_summary_claude(question: str):
     query = question
     msp_name = extract_msp_name(question)
 
-    all_results = collection.get(include=["metadatas"])
-    all_msp_names = [meta.get("msp_name", "") for meta in all_results["metadatas"] if meta.get("msp_name")]
-
-    matches = get_close_matches(msp_name, all_msp_names, n=1, cutoff=0.6)
-    if not matches:
-        return {"answer": "질문하신 회사명을 인식하지 못했습니다. 다시 시도해 주세요.", "advanced": False}
-    best_match = matches[0]
+    best_match = msp_name_index.best_match(msp_name, cutoff=0.6)
+    if not best_match:
+        return {"result": {"answer": "질문하신 회사명을 인식하지 못했습니다. 다시 시도해 주세요.", "advanced": False}}
 
     try:
         # Enhanced data collection - get comprehensive company profile
-        query_vector = query_embed(question)
-        query_results = collection.query(
-            query_embeddings=[query_vector],
-            n_results=15  # Increased for more comprehensive analysis
-        )
+        hits = retriever.search(question, k=15, msp_name=best_match)  # Increased for more comprehensive analysis
         
         # Get ALL data for this company for complete profile
         all_company_data = collection.get(
@@ -484,20 +504,21 @@ def run_msp_information_summary_claude(question: str):
         
         # Organize data by category and relevance
         relevant_chunks = []
+        relevant_scores = []
         all_company_chunks = []
         category_data = defaultdict(list)
         
         # Process query-relevant data
-        for chunk in query_results["metadatas"][0]:
-            if chunk.get("msp_name") == best_match and chunk.get("answer") and chunk.get("question"):
-                relevant_chunks.append({
-                    "question": chunk['question'],
-                    "answer": chunk['answer'],
-                    "score": chunk.get('score', 0),
-                    "category": chunk.get('category', '미분류'),
-                    "group": chunk.get('group', '기타'),
-                    "relevance": "high"  # Query-matched
-                })
+        for hit in hits:
+            relevant_scores.append(hit.relevance)
+            relevant_chunks.append({
+                "question": hit.question,
+                "answer": hit.answer,
+                "score": hit.score or 0,
+                "category": hit.category,
+                "group": hit.group,
+                "relevance": "high"  # Query-matched
+            })
         
         # Process all company data for comprehensive profile
         for chunk in all_company_data["metadatas"]:
@@ -523,7 +544,7 @@ def run_msp_information_summary_claude(question: str):
                     })
 
         if not relevant_chunks and not all_company_chunks:
-            return {"answer": "관련된 정보를 찾을 수 없습니다.", "advanced": False}
+            return {"result": {"answer": "관련된 정보를 찾을 수 없습니다.", "advanced": False}, "msp_name": best_match}
 
         # Calculate comprehensive analytics
         all_scores = [item['score'] for item in relevant_chunks + all_company_chunks if item['score']]
@@ -542,28 +563,33 @@ def run_msp_information_summary_claude(question: str):
         overall_avg = round(sum(all_scores) / len(all_scores), 2) if all_scores else 0
         
         # Create rich context for Claude's analysis
-        # 1. Query-relevant information (prioritized)
-        relevant_context = []
-        for chunk in relevant_chunks[:8]:  # Top 8 most relevant
-            relevant_context.append(
-                f"[관련도: 높음] Q: {chunk['question']}\n"
-                f"A: {chunk['answer']}\n"
-                f"평가: {chunk['score']}/5점 | 분야: {chunk['category']}"
-            )
+        # 1. Query-relevant information (prioritized, most of the token budget)
+        budget = context_budget("claude")
+        relevant_pack = pack_evidence(
+            [{**chunk, "relevance": relevance} for chunk, relevance in zip(relevant_chunks, relevant_scores)],
+            int(budget * 0.6),
+            render=lambda chunk: f"[관련도: 높음] 평가: {chunk['score']}/5점 | 분야: {chunk['category']}\n"
+                                 f"Q: {chunk['question']}\n"
+                                 f"A: {chunk['answer']}",
+            separator="\n\n"
+        )
         
-        # 2. Supplementary company information by category
-        category_context = []
-        for category, analytics in category_analytics.items():
-            if analytics['count'] > 0:
-                # Select best examples from each category
-                top_items = sorted(category_data[category], key=lambda x: x['score'], reverse=True)[:3]
-                
-                category_block = f"\n=== {category} (평균: {analytics['avg_score']}/5점, {analytics['count']}개 항목) ===\n"
-                for item in top_items:
-                    category_block += f"• Q: {item['question'][:80]}{'...' if len(item['question']) > 80 else ''}\n"
-                    category_block += f"  A: {item['answer'][:150]}{'...' if len(item['answer']) > 150 else ''} ({item['score']}/5점)\n\n"
-                
-                category_context.append(category_block)
+        # 2. Supplementary company information by category, in whatever budget is left
+        def category_header(category):
+            analytics = category_analytics[category]
+            return f"\n=== {category} (평균: {analytics['avg_score']}/5점, {analytics['count']}개 항목) ==="
+
+        category_pack = pack_evidence(
+            [{**item, "category": category}
+             for category in category_analytics
+             for item in sorted(category_data[category], key=lambda x: x['score'], reverse=True)[:3]],
+            budget - relevant_pack["tokens_used"],
+            render=lambda item: f"• ({item['score']}/5점) Q: {item['question']}\n  A: {item['answer']}",
+            group_by=lambda item: item["category"],
+            header=category_header,
+            rank=lambda item: item["score"] or 0
+        )
+        print(f"🧮 Information context: {relevant_pack['tokens_used'] + category_pack['tokens_used']}/{budget} tokens")
 
         # 3. Company strength/weakness analysis
         strengths = []
@@ -588,10 +614,10 @@ def run_msp_information_summary_claude(question: str):
 개선 필요 분야: {', '.join(improvements) if improvements else '특이사항 없음'}
 
 === 질문 관련성 높은 정보 ===
-{chr(10).join(relevant_context)}
+{relevant_pack["text"]}
 
 === 카테고리별 상세 역량 ===
-{''.join(category_context)}
+{category_pack["text"]}
 
 === 전문가 분석 지침 ===
 
@@ -643,9 +669,7 @@ def run_msp_information_summary_claude(question: str):
 - 점수가 낮은 영역도 맥락을 고려하여 해석하세요
 - 불충분한 정보 영역은 솔직하게 언급하세요"""
 
-        client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-        
-        response = client.messages.create(
+        claude_request = dict(
             model="claude-3-haiku-20240307",
             max_tokens=1500,  # Increased for comprehensive analysis
             temperature=0.2,  # Lower for more analytical responses
@@ -656,8 +680,11 @@ def run_msp_information_summary_claude(question: str):
             }]
         )
         
-        answer = response.content[0].text.strip()
-        
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Claude API error: {str(e)}")
+
+    def finalize(answer):
         # Enhanced post-processing
         answer = answer.replace("설루션", "솔루션")
         answer = answer.replace("클라우드 서비스", "클라우드 솔루션")
@@ -678,12 +705,25 @@ def run_msp_information_summary_claude(question: str):
                 "query_relevant_items": len(relevant_chunks),
                 "total_company_items": len(all_company_chunks) + len(relevant_chunks),
                 "categories_covered": len(category_analytics)
-            }
+            },
+            "context": context_report(relevant_pack, category_pack)
         }
-        
-    except Exception as e:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Claude API error: {str(e)}")
+
+    return {
+        "result": None,
+        "msp_name": best_match,
+        "evidence": relevant_chunks,
+        "claude": claude_request,
+        "finalize": finalize,
+        "error_detail": "Claude API error"
+    }
+
+def run_msp_information_summary_claude(question: str):
+    """
+    Enhanced information summary leveraging Claude's analytical depth
+    """
+    return run_claude_plan(prepare_msp_information_summary_claude(question))
+
 
 def run_msp_information_summary_pplx(question: str):
     """
@@ -697,22 +737,13 @@ def run_msp_information_summary_pplx(question: str):
     query = question
     msp_name = extract_msp_name(question)
 
-    all_results = collection.get(include=["metadatas"])
-    all_msp_names = [meta.get("msp_name", "") for meta in all_results["metadatas"] if meta.get("msp_name")]
-
-    from difflib import get_close_matches
-    matches = get_close_matches(msp_name, all_msp_names, n=1, cutoff=0.6)
-    if not matches:
+    best_match = msp_name_index.best_match(msp_name, cutoff=0.6)
+    if not best_match:
         return {"answer": "질문하신 회사명을 인식하지 못했습니다. 다시 시도해 주세요.", "advanced": True}
-    best_match = matches[0]
 
     try:
         # Enhanced internal data collection
-        query_vector = query_embed(question)
-        query_results = collection.query(
-            query_embeddings=[query_vector],
-            n_results=12  # Increased for comprehensive internal context
-        )
+        hits = retriever.search(question, k=12, msp_name=best_match)  # Increased for comprehensive internal context
         
         # Get comprehensive company profile from internal data
         all_company_data = collection.get(
@@ -725,14 +756,15 @@ def run_msp_information_summary_pplx(question: str):
         category_data = defaultdict(list)
         
         # Process query-relevant internal data
-        for chunk in query_results["metadatas"][0]:
-            if chunk.get("msp_name") == best_match and chunk.get("answer") and chunk.get("question"):
-                internal_chunks.append({
-                    "question": chunk['question'],
-                    "answer": chunk['answer'],
-                    "score": chunk.get('score', 0),
-                    "category": chunk.get('category', '미분류')
-                })
+        internal_relevance = []
+        for hit in hits:
+            internal_relevance.append(hit.relevance)
+            internal_chunks.append({
+                "question": hit.question,
+                "answer": hit.answer,
+                "score": hit.score or 0,
+                "category": hit.category
+            })
         
         # Process all company data for context
         for chunk in all_company_data["metadatas"]:
@@ -751,16 +783,16 @@ def run_msp_information_summary_pplx(question: str):
         
         internal_avg = round(sum(all_internal_scores) / len(all_internal_scores), 2) if all_internal_scores else 0
         
-        # Create comprehensive internal context
-        internal_context_blocks = []
-        for chunk in internal_chunks[:6]:  # Top 6 most relevant
-            internal_context_blocks.append(
-                f"평가: {chunk['score']}/5점 | {chunk['category']}\n"
-                f"Q: {chunk['question']}\n"
-                f"A: {chunk['answer'][:200]}{'...' if len(chunk['answer']) > 200 else ''}"
-            )
-        
-        internal_context = "\n\n".join(internal_context_blocks) if internal_context_blocks else "내부 평가 데이터 없음"
+        # Create comprehensive internal context within the Perplexity evidence budget
+        internal_pack = pack_evidence(
+            [{**chunk, "relevance": relevance} for chunk, relevance in zip(internal_chunks, internal_relevance)],
+            context_budget("perplexity"),
+            render=lambda chunk: f"평가: {chunk['score']}/5점 | {chunk['category']}\n"
+                                 f"Q: {chunk['question']}\n"
+                                 f"A: {chunk['answer']}",
+            separator="\n\n"
+        )
+        internal_context = internal_pack["text"] or "내부 평가 데이터 없음"
         
         # Adaptive prompt based on question complexity
         def detect_question_complexity(question: str):
@@ -973,6 +1005,7 @@ def run_msp_information_summary_pplx(question: str):
                     "categories_covered": len(category_data),
                     "web_enhanced": True
                 },
+                "context": context_report(internal_pack),
                 "analysis_type": "comprehensive_web_intelligence"
             }
         else:
@@ -1021,15 +1054,63 @@ def run_msp_information_summary_pplx(question: str):
             "advanced": True
         }
 
-def extract_msp_name(question: str) -> str:
-    from openai import OpenAI
-    import os
+# --- MSP name extraction: local fast path, LLM fallback, memoized per request ---
+def _load_naver_search_module():
+    """Load mcp/naver_mcp_server.py by path (the mcp directory is not a package)"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "naver_mcp_server.py")
+    spec = importlib.util.spec_from_file_location("naver_mcp_server", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
 
-    CLOVA_API_KEY = os.getenv("CLOVA_API_KEY_OPENAI")
-    API_URL = "https://clovastudio.stream.ntruss.com/v1/openai"
-    client = OpenAI(api_key=CLOVA_API_KEY, base_url=API_URL)
-    model = "HCX-005"
+naver_search = _load_naver_search_module()
+
+# Set by the query routes so every handler in one request shares a single extraction
+_extracted_msp_names = contextvars.ContextVar("extracted_msp_names", default=None)
+
+@contextlib.contextmanager
+def msp_name_extraction_scope():
+    """Memoize extract_msp_name results for the duration of one request"""
+    token = _extracted_msp_names.set({})
+    try:
+        yield
+    finally:
+        _extracted_msp_names.reset(token)
 
+def extract_msp_name_local(question: str):
+    """
+    Resolve the company without an LLM call: known names/aliases via Aho-Corasick first,
+    then the naver search server's question patterns resolved against the name index.
+    Returns None when nothing is confident.
+    """
+    mention = msp_name_index.find_mention(question)
+    if mention:
+        return mention
+
+    candidate = naver_search.extract_company_name_by_pattern(question)
+    if not candidate:
+        return None
+    # A pattern capture is only trusted when it is a known company; anything else
+    # (e.g. "요즘" from "요즘 뉴스") goes to the LLM extractor
+    return msp_name_index.best_match(candidate, cutoff=0.8)
+
+def extract_msp_name(question: str) -> str:
+    memo = _extracted_msp_names.get()
+    if memo is not None and question in memo:
+        return memo[question]
+
+    name = extract_msp_name_local(question)
+    if name:
+        print(f"🔍 Extracted MSP name locally: {name}")
+    else:
+        name = extract_msp_name_llm(question)
+
+    if memo is not None:
+        memo[question] = name
+    return name
+
+def _msp_name_extraction_request(question: str):
+    """Chat completion arguments for the HCX-005 company name extractor"""
     prompt = (
         f"다음 질문에서 실제 클라우드 MSP 파트너사의 이름만 정확하게 추출하세요. 문장 전체를 출력하지 말고, 회사명만 출력하세요.\n"
         f"[예시]\n"
@@ -1039,18 +1120,27 @@ def extract_msp_name(question: str) -> str:
         f"질문: '{question}'\n"
         f"응답:"
     )
+    return dict(
+        model="HCX-005",
+        messages=[
+            {"role": "system", "content": "질문에서 클라우드 MSP 회사 이름만 정확하게 추출해 주세요. 문장은 절대 작성하지 말고, 회사명만 단독으로 출력하세요. 예: 베스핀글로벌"},
+            {"role": "user", "content": prompt}
+        ],
+        top_p=0.6,
+        temperature=0.3,
+        max_tokens=20
+    )
+
+def extract_msp_name_llm(question: str) -> str:
+    from openai import OpenAI
+    import os
+
+    CLOVA_API_KEY = os.getenv("CLOVA_API_KEY_OPENAI")
+    API_URL = "https://clovastudio.stream.ntruss.com/v1/openai"
+    client = OpenAI(api_key=CLOVA_API_KEY, base_url=API_URL)
 
     try:
-        clova_response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "질문에서 클라우드 MSP 회사 이름만 정확하게 추출해 주세요. 문장은 절대 작성하지 말고, 회사명만 단독으로 출력하세요. 예: 베스핀글로벌"},
-                {"role": "user", "content": prompt}
-            ],
-            top_p=0.6,
-            temperature=0.3,
-            max_tokens=20
-        )
+        clova_response = client.chat.completions.create(**_msp_name_extraction_request(question))
         raw = clova_response.choices[0].message.content.strip()
         print(f"🔍 Extracted raw MSP name: {raw}")
         return raw
@@ -1058,51 +1148,119 @@ def extract_msp_name(question: str) -> str:
         print(f"❌ Error extracting MSP name: {e}")
         return ""
 
+async def aextract_msp_name_llm(question: str) -> str:
+    from openai import AsyncOpenAI
+
+    CLOVA_API_KEY = os.getenv("CLOVA_API_KEY_OPENAI")
+    API_URL = "https://clovastudio.stream.ntruss.com/v1/openai"
+    client = AsyncOpenAI(api_key=CLOVA_API_KEY, base_url=API_URL)
+
+    try:
+        clova_response = await client.chat.completions.create(**_msp_name_extraction_request(question))
+        raw = clova_response.choices[0].message.content.strip()
+        print(f"🔍 Extracted raw MSP name: {raw}")
+        return raw
+    except Exception as e:
+        print(f"❌ Error extracting MSP name: {e}")
+        return ""
+    finally:
+        await client.close()
+
+async def aextract_msp_name(question: str) -> str:
+    """Async extract_msp_name: the local path runs on the blocking pool, the LLM fallback is awaited"""
+    memo = _extracted_msp_names.get()
+    if memo is not None and question in memo:
+        return memo[question]
+
+    name = await run_blocking(extract_msp_name_local, question)
+    if name:
+        print(f"🔍 Extracted MSP name locally: {name}")
+    else:
+        name = await aextract_msp_name_llm(question)
+
+    if memo is not None:
+        memo[question] = name
+    return name
+
+# --- Evidence fan-out for the news summaries ---
+EVIDENCE_MAX_WORKERS = int(os.getenv("EVIDENCE_MAX_WORKERS", "16"))
+EVIDENCE_VECTOR_TIMEOUT = float(os.getenv("EVIDENCE_VECTOR_TIMEOUT", "15"))
+EVIDENCE_SEARCH_TIMEOUT = float(os.getenv("EVIDENCE_SEARCH_TIMEOUT", "20"))
+
+# Shared by every request so concurrent questions cannot spawn unbounded threads.
+# future.cancel() only removes tasks that have not started; a task that misses its deadline keeps
+# its worker until the call returns, which the per-call HTTP timeouts bound (NAVER_SEARCH_TIMEOUT,
+# EMBEDDING_TIMEOUT). The slot semaphore caps queued + running tasks at the pool size, so when
+# stragglers hold every worker new sources fall back to their default instead of queueing.
+_evidence_pool = ThreadPoolExecutor(max_workers=EVIDENCE_MAX_WORKERS, thread_name_prefix="evidence")
+_evidence_slots = threading.BoundedSemaphore(EVIDENCE_MAX_WORKERS)
+
+def gather_evidence(sources: dict):
+    """
+    Run independent evidence sources concurrently.
+    sources maps name -> (func, deadline_seconds, default); a source that raises or misses its
+    deadline contributes its default, so latency is bounded by the slowest deadline, not the sum.
+    """
+    start = time.monotonic()
+    futures = {}
+    results = {}
+    for name, (func, _, default) in sources.items():
+        if not _evidence_slots.acquire(blocking=False):
+            print(f"⚠️ Evidence pool saturated, skipping source '{name}'")
+            results[name] = default
+            continue
+        future = _evidence_pool.submit(contextvars.copy_context().run, func)
+        future.add_done_callback(lambda _: _evidence_slots.release())
+        futures[name] = future
+
+    for name, future in futures.items():
+        _, deadline, default = sources[name]
+        try:
+            results[name] = future.result(timeout=max(0.0, start + deadline - time.monotonic()))
+        except FuturesTimeoutError:
+            # Only effective if the task has not started; a running call ends at its own HTTP timeout
+            future.cancel()
+            print(f"⏱️ Evidence source '{name}' missed its {deadline}s deadline")
+            results[name] = default
+        except Exception as e:
+            print(f"⚠️ Evidence source '{name}' failed: {e}")
+            results[name] = default
+    print(f"[DEBUG] Evidence gathered in {time.monotonic() - start:.2f}s")
+    return results
+
+def fetch_internal_qa(question: str, msp_name: str, limit: int, with_score: bool):
+    """Q/A lines for the question's best-matching chunks of msp_name"""
+    msp_name = msp_name_index.best_match(msp_name, cutoff=0.6) or msp_name
+    hits = retriever.search(question, k=limit, msp_name=msp_name)
+    if with_score:
+        fmt = lambda hit: f"Q: {hit.question}\nA: {hit.answer} (점수: {hit.score if hit.score is not None else 'N/A'}/5)"
+    else:
+        fmt = lambda hit: f"Q: {hit.question}\nA: {hit.answer}"
+    return [fmt(hit) for hit in hits]
+
+def naver_openapi_search(endpoint: str, query: str, display: int):
+    """Raw Naver search Open API JSON (endpoint: news or webkr) via the in-process search client"""
+    return naver_search.search_api(endpoint, query, display)
+
 def run_msp_news_summary_clova(question: str):
-    import urllib.parse
-    import urllib.request
     import traceback
 
     msp_name = extract_msp_name(question)
     if not msp_name:
         return {"answer": "회사명을 인식하지 못했습니다. 다시 시도해 주세요.", "advanced": True}
 
-    # Get vector DB information for the MSP
-    try:
-        query_vector = query_embed(question)
-        query_results = collection.query(
-            query_embeddings=[query_vector],
-            n_results=10
-        )
-        db_chunks = [
-            f"Q: {chunk['question']}\nA: {chunk['answer']}"
-            for chunk in query_results["metadatas"][0]
-            if chunk.get("msp_name") == msp_name and chunk.get("question") and chunk.get("answer")
-        ][:5]
-        db_context = "\n\n".join(db_chunks)
-    except Exception as e:
-        db_context = ""
+    # Vector DB, news and web evidence are independent: fetch them concurrently
+    evidence = gather_evidence({
+        "db": (lambda: fetch_internal_qa(question, msp_name, limit=5, with_score=False),
+               EVIDENCE_VECTOR_TIMEOUT, []),
+        "news": (lambda: naver_openapi_search("news", msp_name, 10), EVIDENCE_SEARCH_TIMEOUT, {}),
+        "web": (lambda: naver_openapi_search("webkr", msp_name, 3), EVIDENCE_SEARCH_TIMEOUT, {}),
+    })
+    db_context = "\n\n".join(evidence["db"])
+    news_data = evidence["news"]
+    web_data = evidence["web"]
 
     try:
-        query = urllib.parse.quote(msp_name)
-        url = f"https://openapi.naver.com/v1/search/news.json?query={query}&display=10&sort=sim"
-        headers = {
-            "X-Naver-Client-Id": os.getenv("NAVER_CLIENT_ID"),
-            "X-Naver-Client-Secret": os.getenv("NAVER_CLIENT_SECRET")
-        }
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req) as response:
-            if response.status != 200:
-                raise Exception(f"Naver API Error: {response.status}")
-            news_data = json.loads(response.read().decode("utf-8"))
-
-        url_web = f"https://openapi.naver.com/v1/search/webkr.json?query={query}&display=3&sort=sim"
-        req_web = urllib.request.Request(url_web, headers=headers)
-        with urllib.request.urlopen(req_web) as response_web:
-            if response_web.status != 200:
-                raise Exception(f"Naver Web API Error: {response_web.status}")
-            web_data = json.loads(response_web.read().decode("utf-8"))
-
         if "items" not in news_data or not news_data["items"]:
             return {"answer": f"{msp_name}에 대한 뉴스 기사를 찾을 수 없습니다.", "advanced": True}
 
@@ -1155,8 +1313,6 @@ def run_msp_news_summary_claude(question: str):
     """
     Enhanced version with more data for Claude
     """
-    import urllib.parse
-    import urllib.request
     import traceback
     import anthropic
     import os
@@ -1165,46 +1321,19 @@ def run_msp_news_summary_claude(question: str):
     if not msp_name:
         return {"answer": "회사명을 인식하지 못했습니다. 다시 시도해 주세요.", "advanced": True}
 
-    # Enhanced vector DB search - get more relevant data for Claude
-    try:
-        query_vector = query_embed(question)
-        query_results = collection.query(
-            query_embeddings=[query_vector],
-            n_results=15
-        )
-        db_chunks = [
-            f"Q: {chunk['question']}\nA: {chunk['answer']} (점수: {chunk.get('score', 'N/A')}/5)"
-            for chunk in query_results["metadatas"][0]
-            if chunk.get("msp_name") == msp_name and chunk.get("question") and chunk.get("answer")
-        ][:8]
-        db_context = "\n\n".join(db_chunks)
-    except Exception as e:
-        db_context = ""
+    # Enhanced vector DB search plus more news/web coverage, fetched concurrently
+    evidence = gather_evidence({
+        "db": (lambda: fetch_internal_qa(question, msp_name, limit=8, with_score=True),
+               EVIDENCE_VECTOR_TIMEOUT, []),
+        "news": (lambda: naver_openapi_search("news", msp_name, 15), EVIDENCE_SEARCH_TIMEOUT, {}),
+        "web": (lambda: naver_openapi_search("webkr", msp_name, 7), EVIDENCE_SEARCH_TIMEOUT, {}),
+    })
+    db_chunks = evidence["db"]
+    db_context = "\n\n".join(db_chunks)
+    news_data = evidence["news"]
+    web_data = evidence["web"]
 
     try:
-        # Enhanced API calls - get more comprehensive data
-        query = urllib.parse.quote(msp_name)
-        
-        # Get more news articles for better coverage
-        url = f"https://openapi.naver.com/v1/search/news.json?query={query}&display=15&sort=sim"
-        headers = {
-            "X-Naver-Client-Id": os.getenv("NAVER_CLIENT_ID"),
-            "X-Naver-Client-Secret": os.getenv("NAVER_CLIENT_SECRET")
-        }
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req) as response:
-            if response.status != 200:
-                raise Exception(f"Naver API Error: {response.status}")
-            news_data = json.loads(response.read().decode("utf-8"))
-
-        # Get more web documents for comprehensive view
-        url_web = f"https://openapi.naver.com/v1/search/webkr.json?query={query}&display=7&sort=sim"
-        req_web = urllib.request.Request(url_web, headers=headers)
-        with urllib.request.urlopen(req_web) as response_web:
-            if response_web.status != 200:
-                raise Exception(f"Naver Web API Error: {response_web.status}")
-            web_data = json.loads(response_web.read().decode("utf-8"))
-
         if "items" not in news_data or not news_data["items"]:
             return {"answer": f"{msp_name}에 대한 뉴스 기사를 찾을 수 없습니다.", "advanced": True}
 
@@ -1303,130 +1432,42 @@ def run_msp_news_summary_claude(question: str):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Claude API error: {str(e)}")
 
-import subprocess
-import json
 import traceback
 import anthropic
 import os
 
-def call_naver_search_server(command: str, *args):
-    """네이버 검색 서버 호출"""
-    try:
-        cmd = ["python3", "./mcp/naver_mcp_server.py", command] + list(args)
-        
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=45,
-            cwd=os.getcwd()
-        )
-        
-        if result.returncode == 0:
-            return result.stdout.strip()
-        else:
-            return f"서버 호출 실패 (코드: {result.returncode}): {result.stderr}"
-            
-    except subprocess.TimeoutExpired:
-        return "네이버 검색 서버 타임아웃 (45초 초과)"
-    except Exception as e:
-        return f"서버 호출 중 오류: {str(e)}"
-
-def parse_search_results_for_claude(raw_text: str, search_type: str = "news"):
-    """
-    검색 결과를 Claude가 분석하기 좋은 형태로 변환
-    """
-    items = []
-
-    print(f"🔍 PARSE DEBUG: 입력 텍스트 길이: {len(raw_text)}")
-    print(f"🔍 PARSE DEBUG: 텍스트 시작: {raw_text[:200]}...")
-    
-    if not raw_text or "오류" in raw_text or "실패" in raw_text:
-        print(f"❌ PARSE DEBUG: 텍스트가 비어있거나 오류 포함")
-    
-    if not raw_text or "오류" in raw_text or "실패" in raw_text:
-        return items
-    
-    try:
-        if search_type == "news":
-            # "📰 뉴스 1", "📰 뉴스 2" 패턴으로 분할
-            import re
-            sections = re.split(r'📰 뉴스 \d+', raw_text)[1:]
-            print(f"🔍 PARSE DEBUG: 분할된 섹션 수: {len(sections)}")
-        else:
-            sections = raw_text.split("🌐 웹문서")[1:]
-        
-        for i, section in enumerate(sections):
-            print(f"🔍 PARSE DEBUG: 섹션 {i+1}: {section[:100]}...")
-            lines = section.strip().split('\n')
-            item = {}
-            
-            for line in lines:
-                line = line.strip()
-                if line.startswith('제목:'):
-                    item['title'] = line.replace('제목:', '').strip()
-                elif line.startswith('세부내용:') or line.startswith('요약:'):
-                    item['description'] = line.replace('세부내용:', '').replace('요약:', '').strip()
-                elif line.startswith('날짜:'):
-                    item['pubDate'] = line.replace('날짜:', '').strip()
-                elif line.startswith('링크:'):
-                    item['link'] = line.replace('링크:', '').strip()
-            
-            if item.get('title') and item.get('description'):
-                items.append(item)
-        
-        return items
-        
-    except Exception as e:
-        print(f"파싱 오류: {e}")
-        return []
-
-def run_msp_news_summary_mcp(question: str):
-    """
-    MCP 아키텍처 기반 뉴스 요약
-    """
+def prepare_msp_news_summary_mcp(question: str):
+    """run_msp_news_summary_mcp의 회사명 추출, 근거 수집, 프롬프트 구성 단계"""
     
     msp_name = extract_msp_name(question)
     print(f"🔍 DEBUG: 추출된 회사명: {msp_name}")
     if not msp_name:
-        return {"answer": "회사명을 인식하지 못했습니다. 다시 시도해 주세요.", "advanced": True}
+        return {"result": {"answer": "회사명을 인식하지 못했습니다. 다시 시도해 주세요.", "advanced": True}}
 
-    # 내부 벡터 DB 검색
-    try:
-        query_vector = query_embed(question)
-        query_results = collection.query(
-            query_embeddings=[query_vector],
-            n_results=15
-        )
-        db_chunks = [
-            f"Q: {chunk['question']}\nA: {chunk['answer']} (점수: {chunk.get('score', 'N/A')}/5)"
-            for chunk in query_results["metadatas"][0]
-            if chunk.get("msp_name") == msp_name and chunk.get("question") and chunk.get("answer")
-        ][:8]
-        db_context = "\n\n".join(db_chunks)
-    except Exception as e:
-        db_context = ""
+    print(f"MCP 서버를 통한 '{msp_name}' 검색 시작...")
+
+    # 내부 벡터 DB 검색과 MCP 서버 뉴스/웹 검색을 동시에 실행
+    evidence = gather_evidence({
+        "db": (lambda: fetch_internal_qa(question, msp_name, limit=8, with_score=True),
+               EVIDENCE_VECTOR_TIMEOUT, []),
+        "news": (lambda: naver_search.search_news_items(msp_name, 15), EVIDENCE_SEARCH_TIMEOUT, {"items": []}),
+        "web": (lambda: naver_search.search_web_items(msp_name, 7), EVIDENCE_SEARCH_TIMEOUT, {"items": []}),
+    })
+    db_chunks = evidence["db"]
+    db_context = "\n\n".join(db_chunks)
 
     try:
-        print(f"MCP 서버를 통한 '{msp_name}' 검색 시작...")
-        
-        # MCP 서버를 통한 검색 (기존 API 호출 대체)
-        news_raw = call_naver_search_server("news", msp_name, "15")
-        web_raw = call_naver_search_server("web", msp_name, "7")
-        
         print(f"MCP 검색 완료")
-        print(f"📊 DEBUG: 뉴스 raw 길이: {len(news_raw)}")
-        print(f"📊 DEBUG: 뉴스 raw 시작: {news_raw[:100]}...")
-        
-        # 검색 결과를 기존 형식으로 변환
-        news_items_parsed = parse_search_results_for_claude(news_raw, "news")
-        web_items_parsed = parse_search_results_for_claude(web_raw, "web")
+
+        # 검색 서버가 구조화된 항목을 바로 반환 (텍스트 파싱 불필요)
+        news_items_parsed = [item for item in evidence["news"]["items"] if item.get("title") and item.get("description")]
+        web_items_parsed = [item for item in evidence["web"]["items"] if item.get("title") and item.get("description")]
         
-        print(f"📊 DEBUG: 파싱된 뉴스 아이템 수: {len(news_items_parsed)}")
+        print(f"📊 DEBUG: 뉴스 아이템 수: {len(news_items_parsed)}")
         
         if not news_items_parsed:
             print(f"❌ DEBUG: 뉴스 아이템이 없어서 종료")
-            return {"answer": f"{msp_name}에 대한 뉴스 기사를 찾을 수 없습니다.", "advanced": True}
+            return {"result": {"answer": f"{msp_name}에 대한 뉴스 기사를 찾을 수 없습니다.", "advanced": True}, "msp_name": msp_name}
 
         # 데이터 정리 로직
         def clean_text(text):
@@ -1481,24 +1522,10 @@ def run_msp_news_summary_mcp(question: str):
 
     except Exception as e:
         traceback.print_exc()
-        return {"answer": f"MCP 기반 검색에 실패했습니다: {str(e)}", "advanced": True}
+        return {"result": {"answer": f"MCP 기반 검색에 실패했습니다: {str(e)}", "advanced": True}, "msp_name": msp_name}
 
-    # Claude API 호출
-    try:
-        client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-        
-        response = client.messages.create(
-            model="claude-3-haiku-20240307",
-            max_tokens=1500,
-            temperature=0.2,
-            system="당신은 10년 이상 경력의 클라우드 및 MSP 전문 컨설턴트입니다. 다양한 정보원을 종합 분석하여 객관적이고 실용적인 통찰을 제공하며, 구체적 근거와 데이터에 기반한 전문가 수준의 평가를 중시합니다.",
-            messages=[{
-                "role": "user", 
-                "content": prompt
-            }]
-        )
-        
-        answer = response.content[0].text.strip()
+    # Claude 응답 후처리 (응답 생성은 run_claude_plan / stream_claude_plan)
+    def finalize(answer):
         answer = answer.replace("설루션", "솔루션")
         answer = answer.replace("클라우드 서비스", "클라우드 솔루션")
         
@@ -1515,21 +1542,42 @@ def run_msp_news_summary_mcp(question: str):
                 "total_sources": len(news_items) + len(web_items) + len(db_chunks)
             },
             "mcp_integration": {
-                "server_type": "simple_subprocess",
+                "server_type": "in_process_client",
                 "data_source": "naver_mcp_server",
                 "architecture": "modular_mcp_approach"
             }
         }
-        
-    except Exception as e:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Claude API error: {str(e)}")
+
+    return {
+        "result": None,
+        "msp_name": msp_name,
+        "evidence": news_items_parsed[:12],
+        "web_evidence": web_items_parsed[:5],
+        "claude": dict(
+            model="claude-3-haiku-20240307",
+            max_tokens=1500,
+            temperature=0.2,
+            system="당신은 10년 이상 경력의 클라우드 및 MSP 전문 컨설턴트입니다. 다양한 정보원을 종합 분석하여 객관적이고 실용적인 통찰을 제공하며, 구체적 근거와 데이터에 기반한 전문가 수준의 평가를 중시합니다.",
+            messages=[{
+                "role": "user", 
+                "content": prompt
+            }]
+        ),
+        "finalize": finalize,
+        "error_detail": "Claude API error"
+    }
+
+def run_msp_news_summary_mcp(question: str):
+    """
+    MCP 아키텍처 기반 뉴스 요약
+    """
+    return run_claude_plan(prepare_msp_news_summary_mcp(question))
 
 # 헬스체크 함수
 def check_mcp_server_status():
     """MCP 서버 상태 확인"""
     try:
-        result = call_naver_search_server("extract", "테스트 질문")
+        result = naver_search.extract_company_name_simple("테스트 질문")
         return "MCP 서버 정상 작동" if "테스트" in result else f"MCP 서버 이상: {result[:100]}"
     except Exception as e:
         return f"MCP 서버 연결 실패: {str(e)}"
@@ -0,0 +1,317 @@
+import re
+import threading
+import unicodedata
+from collections import deque
+from difflib import SequenceMatcher
+
+# Hangul syllable block and simplified Revised Romanization tables (no assimilation rules)
+HANGUL_BASE = 0xAC00
+HANGUL_LAST = 0xD7A3
+HANGUL_SYLLABLE = re.compile(r"[가-힣]")
+HANGUL_JAMO = re.compile(r"[ᄀ-ᇿ]")
+# Prefix/containment only counts when the shorter key is this long (about two Hangul syllables)
+MIN_CONTAINED_KEY_LENGTH = 4
+ROMAN_INITIALS = ["g", "kk", "n", "d", "tt", "r", "m", "b", "pp", "s", "ss", "", "j", "jj", "ch", "k", "t", "p", "h"]
+ROMAN_MEDIALS = ["a", "ae", "ya", "yae", "eo", "e", "yeo", "ye", "o", "wa", "wae", "oe", "yo", "u", "wo", "we", "wi",
+                 "yu", "eu", "ui", "i"]
+ROMAN_FINALS = ["", "k", "k", "k", "n", "n", "n", "t", "l", "k", "m", "l", "l", "l", "p", "l", "m", "p", "p", "t", "t",
+                "ng", "t", "t", "k", "t", "p", "t"]
+
+# Legal-entity markers that users rarely type when asking about a company
+COMPANY_SUFFIXES = re.compile(r"\(주\)|주식회사|\(유\)|유한회사|\b(co|corp|inc|ltd)\b\.?")
+NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_name(name: str) -> str:
+    """NFKC + casefold, drop legal-entity markers, whitespace and punctuation"""
+    text = unicodedata.normalize("NFKC", name or "").casefold()
+    text = COMPANY_SUFFIXES.sub("", text)
+    return NON_WORD.sub("", text).replace("_", "")
+
+
+def to_jamo(text: str) -> str:
+    """Decompose Hangul syllables into conjoining jamo so near-miss spellings still share characters"""
+    return unicodedata.normalize("NFD", text)
+
+
+def romanize(text: str) -> str:
+    """Romanize Hangul syllables letter by letter; other characters pass through unchanged"""
+    out = []
+    for ch in text:
+        code = ord(ch)
+        if HANGUL_BASE <= code <= HANGUL_LAST:
+            offset = code - HANGUL_BASE
+            out.append(ROMAN_INITIALS[offset // 588])
+            out.append(ROMAN_MEDIALS[(offset % 588) // 28])
+            out.append(ROMAN_FINALS[offset % 28])
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def name_keys(name: str):
+    """Comparison keys for a name: (normalized jamo form, romanized form)"""
+    normalized = normalize_name(name)
+    return to_jamo(normalized), romanize(normalized)
+
+
+def trigrams(key: str):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: finds every occurrence of every pattern in one pass over the text"""
+
+    def __init__(self, patterns):
+        # patterns: {pattern string: value}
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern, value in patterns.items():
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append((len(pattern), value))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text):
+        """Yield (start, end, value) for every pattern occurrence"""
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for length, value in self._out[state]:
+                yield i - length + 1, i + 1, value
+
+
+class MspNameIndex:
+    """
+    Deduplicated MSP name index with a trigram candidate filter.
+    Built lazily from one scan of the vector store and kept current through company_store write hooks,
+    so lookups cost a few set intersections over distinct names instead of a scan over every chunk.
+    """
+
+    def __init__(self, collection, page_size=1000):
+        self.collection = collection
+        self.page_size = page_size
+        self._lock = threading.RLock()
+        self._built = False
+        self._keys = {}            # canonical name -> (jamo key, roman key)
+        self._by_normalized = {}   # normalized key -> canonical name
+        self._grams = {}           # trigram -> set of canonical names
+        self._automaton = None     # Aho-Corasick over normalized names/aliases, rebuilt on demand
+
+    # --- maintenance ---
+    def _add_locked(self, name):
+        if not name or name in self._keys:
+            return
+        self._automaton = None
+        keys = name_keys(name)
+        self._keys[name] = keys
+        for key in keys:
+            self._by_normalized.setdefault(key, name)
+            for gram in trigrams(key):
+                self._grams.setdefault(gram, set()).add(name)
+
+    def _remove_locked(self, name):
+        keys = self._keys.pop(name, None)
+        if keys is None:
+            return
+        self._automaton = None
+        for key in keys:
+            if self._by_normalized.get(key) == name:
+                del self._by_normalized[key]
+            for gram in trigrams(key):
+                names = self._grams.get(gram)
+                if names:
+                    names.discard(name)
+                    if not names:
+                        del self._grams[gram]
+
+    def rebuild(self):
+        """Rescan the store's msp_name values page by page"""
+        names = set()
+        offset = 0
+        while True:
+            page = self.collection.get(limit=self.page_size, offset=offset, include=["metadatas"])
+            metadatas = page["metadatas"]
+            names.update(meta.get("msp_name") for meta in metadatas if meta.get("msp_name"))
+            offset += len(metadatas)
+            if len(metadatas) < self.page_size:
+                break
+        with self._lock:
+            self._keys.clear()
+            self._by_normalized.clear()
+            self._grams.clear()
+            self._automaton = None
+            for name in sorted(names):
+                self._add_locked(name)
+            self._built = True
+        print(f"[DEBUG] MSP name index built with {len(names)} companies")
+
+    def invalidate(self):
+        with self._lock:
+            self._built = False
+
+    def refresh(self, msp_name=None):
+        """Write hook: re-check one company after ingest/delete, or drop the index when many changed"""
+        if msp_name is None:
+            self.invalidate()
+            return
+        with self._lock:
+            if not self._built:
+                return
+        present = bool(self.collection.get(where={"msp_name": msp_name}, limit=1)["ids"])
+        with self._lock:
+            if present:
+                self._add_locked(msp_name)
+            else:
+                self._remove_locked(msp_name)
+
+    def _ensure_built(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.rebuild()
+
+    # --- lookup ---
+    def names(self):
+        self._ensure_built()
+        with self._lock:
+            return list(self._keys)
+
+    def best_match(self, query: str, cutoff: float = 0.6):
+        """
+        Return the closest indexed company name, or None when nothing scores at least cutoff.
+        Hangul queries are compared on the jamo key and Latin-script queries on the romanized key;
+        names that start with or contain the query rank ahead of fuzzy matches.
+        """
+        self._ensure_built()
+        if not query or not normalize_name(query):
+            return None
+        jamo_key, roman_key = name_keys(query)
+        # Romanizing a Hangul query makes unrelated names look alike ("beseupin" vs "eseukei")
+        key_index = 0 if HANGUL_SYLLABLE.search(jamo_key) or HANGUL_JAMO.search(jamo_key) else 1
+        query_key = (jamo_key, roman_key)[key_index]
+
+        with self._lock:
+            exact = self._by_normalized.get(query_key)
+            if exact:
+                return exact
+
+            candidates = set()
+            for gram in trigrams(query_key):
+                candidates.update(self._grams.get(gram, ()))
+            scored = [(name, self._keys[name][key_index]) for name in candidates]
+
+        best_name, best_rank = None, None
+        for name, key in scored:
+            shorter = min(len(key), len(query_key))
+            if key.startswith(query_key) and shorter >= MIN_CONTAINED_KEY_LENGTH:
+                tier = 2
+            elif (query_key in key or key in query_key) and shorter >= MIN_CONTAINED_KEY_LENGTH:
+                tier = 1
+            else:
+                tier = 0
+            score = SequenceMatcher(None, query_key, key).ratio()
+            if tier == 0 and score < cutoff:
+                continue
+            rank = (tier, score, -len(key))
+            if best_rank is None or rank > best_rank:
+                best_name, best_rank = name, rank
+        return best_name
+
+    # --- mention detection ---
+    MIN_ALIAS_LENGTH = 2
+
+    def _aliases_locked(self):
+        """
+        Normalized surface forms that identify a company inside a question:
+        the full normalized name plus each distinctive word of a multi-word name
+        """
+        aliases = {}
+        ambiguous = set()
+        for name in self._keys:
+            forms = {normalize_name(name)}
+            words = [normalize_name(word) for word in name.split()]
+            if len(words) > 1:
+                forms.update(word for word in words if len(word) >= 3)
+            for form in forms:
+                if len(form) < self.MIN_ALIAS_LENGTH:
+                    continue
+                if form in aliases and aliases[form] != name:
+                    ambiguous.add(form)
+                aliases.setdefault(form, name)
+        for form in ambiguous:
+            # A word shared by several companies cannot identify any of them
+            if normalize_name(aliases[form]) != form:
+                del aliases[form]
+        return aliases
+
+    # Aliases shorter than this must be a whole word (plus an optional particle), not a word prefix
+    SHORT_ALIAS_LENGTH = 4
+    PARTICLES = {"의", "은", "는", "이", "가", "을", "를", "와", "과", "도", "에", "에서", "랑", "이랑", "하고"}
+
+    def _at_word_boundary(self, normalized, start, end, word_ends):
+        if start not in word_ends:
+            return False
+        if end - start >= self.SHORT_ALIAS_LENGTH:
+            return True
+        word_end = word_ends[start]
+        return end == word_end or normalized[end:word_end] in self.PARTICLES
+
+    def find_mention(self, text: str):
+        """
+        Return the company named in free text via the Aho-Corasick automaton, or None.
+        Matches must start at a word start, and short aliases must cover the whole word apart from a
+        trailing particle like "의", so they do not hit inside other words. The longest matching alias wins; a tie between different
+        companies is not a confident match.
+        """
+        self._ensure_built()
+        # Normalize word by word to remember where each word starts in the normalized text
+        normalized_words = [normalize_name(word) for word in text.split()] if text else []
+        word_ends = {}   # normalized start offset of each word -> its end offset
+        position = 0
+        for word in normalized_words:
+            if word:
+                word_ends[position] = position + len(word)
+                position += len(word)
+        normalized = "".join(normalized_words)
+        if not normalized:
+            return None
+        with self._lock:
+            if self._automaton is None:
+                self._automaton = AhoCorasick(self._aliases_locked())
+            automaton = self._automaton
+
+        best_length, best_names = 0, set()
+        for start, end, name in automaton.find_all(normalized):
+            if not self._at_word_boundary(normalized, start, end, word_ends):
+                continue
+            length = end - start
+            if length > best_length:
+                best_length, best_names = length, {name}
+            elif length == best_length:
+                best_names.add(name)
+        return next(iter(best_names)) if len(best_names) == 1 else None
@@ -1,10 +1,25 @@
-from msp_core import query_embed, collection  # Reuse existing infrastructure
+from msp_core import query_embed, retriever  # Reuse existing infrastructure
+from vector_store import collection
+from context_builder import pack_evidence, context_budget
 from fastapi import HTTPException
 import anthropic
 import os
 from openai import OpenAI
 from collections import defaultdict
 import traceback
+import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Advanced-mode pipelining: speculative HCX fallback / critic and refiner early exit.
+# Speculation is opt-in: it starts a second HCX-005 generation on every request, even when the draft passes.
+MULTI_LLM_SPECULATIVE = os.getenv("MULTI_LLM_SPECULATIVE", "false").lower() == "true"
+MULTI_LLM_EARLY_EXIT = os.getenv("MULTI_LLM_EARLY_EXIT", "true").lower() == "true"
+MULTI_LLM_MAX_WORKERS = int(os.getenv("MULTI_LLM_MAX_WORKERS", "8"))
+
+# Shared by every request so speculative stages cannot spawn unbounded threads
+_stage_pool = ThreadPoolExecutor(max_workers=MULTI_LLM_MAX_WORKERS, thread_name_prefix="multi-llm")
 
 def run_multi_llm_msp_recommendation(question: str, min_score: int):
     """
@@ -20,15 +35,31 @@ def run_multi_llm_msp_recommendation(question: str, min_score: int):
         # Step 2: Manage context and select companies
         context_data = manage_context_selection(raw_data["grouped_chunks"], question)
         
-        # Step 3: HCX Responder (with fallback)
+        started = time.monotonic()
+
+        # Step 3: HCX Responder (with speculative fallback and critic)
         hcx_result = call_hcx_responder(question, context_data["full_context"])
         
-        # Step 4: Claude Critic
-        critic_result = call_claude_critic(question, hcx_result["recommendation"], context_data["full_context"])
+        # Step 4: Claude Critic - reuse the speculative run when it reviewed the draft we kept
+        speculative = hcx_result.pop("speculative_critic", None)
+        if speculative and speculative[0] == hcx_result["recommendation"]:
+            critic_result = speculative[1].result()
+        else:
+            critic_result = call_claude_critic(question, hcx_result["recommendation"], context_data["full_context"])
         
-        # Step 5: Claude Refiner
-        final_result = call_claude_refiner(question, hcx_result["recommendation"], 
-                                         critic_result["analysis"], context_data["full_context"])
+        # Step 5: Claude Refiner - skipped when the critic found nothing to fix
+        if MULTI_LLM_EARLY_EXIT and not critic_result["needs_refinement"]:
+            print("✅ Critic found no issues, skipping refiner")
+            recommendation = hcx_result["recommendation"].replace("설루션", "솔루션")
+            final_result = {
+                "recommendation": recommendation,
+                "recommendation_length": len(recommendation),
+                "refiner_skipped": True
+            }
+        else:
+            final_result = call_claude_refiner(question, hcx_result["recommendation"], 
+                                             critic_result["analysis"], context_data["full_context"])
+        print(f"⏱️ Multi-LLM chain finished in {time.monotonic() - started:.1f}s")
         
         # Step 6: Compile final response
         return compile_final_response(
@@ -50,24 +81,19 @@ def collect_vector_data(question: str, min_score: int):
     """Collect and organize data from vector database"""
     from collections import defaultdict
     
-    query_vector = query_embed(question)
-    query_results = collection.query(
-        query_embeddings=[query_vector],
-        n_results=20
-    )
+    hits = retriever.search(question, k=20, min_score=min_score)
     
     grouped_chunks = defaultdict(list)
-    for meta in query_results["metadatas"][0]:
-        if not isinstance(meta.get("answer"), str) or not meta["answer"].strip():
-            continue
-        if meta["score"] is not None and int(meta["score"]) >= min_score:
-            grouped_chunks[meta["msp_name"]].append({
-                "question": meta['question'],
-                "answer": meta['answer'],
-                "score": meta['score'],
-                "category": meta.get('category', '미분류'),
-                "group": meta.get('group', '기타')
-            })
+    for hit in hits:
+        grouped_chunks[hit.msp_name].append({
+            "msp_name": hit.msp_name,
+            "question": hit.question,
+            "answer": hit.answer,
+            "score": hit.score,
+            "category": hit.category,
+            "group": hit.group,
+            "relevance": hit.relevance
+        })
 
     # Calculate analytics for each company
     company_analytics = {}
@@ -83,7 +109,7 @@ def collect_vector_data(question: str, min_score: int):
     return {
         "grouped_chunks": grouped_chunks,
         "company_analytics": company_analytics,
-        "query_results": query_results
+        "hits": hits
     }
 
 
@@ -114,7 +140,8 @@ def manage_context_selection(grouped_chunks: dict, question: str):
     selected_companies = company_list[:max_companies]
     
     # Format context
-    full_context = format_company_context(selected_companies)
+    context_pack = build_company_context(selected_companies)
+    full_context = context_pack["text"]
     
     # Track exclusions
     excluded_companies = [item[0] for item in company_list[max_companies:]]
@@ -131,6 +158,9 @@ def manage_context_selection(grouped_chunks: dict, question: str):
             "companies_included": len(selected_companies),
             "companies_excluded": excluded_companies,
             "context_length_chars": len(full_context),
+            "context_tokens": context_pack["tokens_used"],
+            "context_budget": context_pack["budget"],
+            "evidence_items_included": context_pack["items_used"],
             "selection_criteria": "overall_avg_score_descending"
         }
     }
@@ -146,27 +176,31 @@ def calculate_company_analytics(qa_list: list):
     }
 
 
-def format_company_context(selected_companies: list):
-    """Format company data into context string for LLMs"""
-    analysis_context = []
-    
-    for msp, qa_list, analytics in selected_companies:
-        sorted_qa = sorted(qa_list, key=lambda x: (x['score'], len(x['answer'])), reverse=True)
-        top_evidence = sorted_qa[:6]
-        
-        company_block = f"""
+def build_company_context(selected_companies: list):
+    """Pack the selected companies' evidence into the HCX token budget, grouped per company"""
+    analytics_by_msp = {msp: analytics for msp, qa_list, analytics in selected_companies}
+
+    def company_header(msp):
+        analytics = analytics_by_msp[msp]
+        return f"""
 === {msp} 분석 ===
 평균: {analytics['overall_avg']}/5점 | 응답 수: {analytics['total_responses']}개
 상세 답변: {analytics['evidence_quality']}개
 
-핵심 근거:
-{chr(10).join([f"[{qa['score']}점] {qa['category']} | Q: {qa['question'][:60]}{'...' if len(qa['question']) > 60 else ''}" + 
-              f"{chr(10)}    A: {qa['answer'][:200]}{'...' if len(qa['answer']) > 200 else ''}"
-              for qa in top_evidence])}
-"""
-        analysis_context.append(company_block)
-    
-    return "\n".join(analysis_context)
+핵심 근거:"""
+
+    return pack_evidence(
+        [qa for msp, qa_list, analytics in selected_companies for qa in qa_list],
+        context_budget("hcx"),
+        render=lambda qa: f"[{qa['score']}점] {qa['category']} | Q: {qa['question']}{chr(10)}    A: {qa['answer']}",
+        group_by=lambda qa: qa["msp_name"],
+        header=company_header
+    )
+
+
+def format_company_context(selected_companies: list):
+    """Format company data into context string for LLMs"""
+    return build_company_context(selected_companies)["text"]
 
 
 def call_hcx_responder(question: str, full_context: str):
@@ -198,8 +232,15 @@ def call_hcx_responder(question: str, full_context: str):
     CLOVA_API_KEY = os.getenv("CLOVA_API_KEY_OPENAI")
     API_URL = "https://clovastudio.stream.ntruss.com/v1/openai"
     hcx_client = OpenAI(api_key=CLOVA_API_KEY, base_url=API_URL)
+
+    # Opt-in: start the fallback alongside the draft; it is abandoned mid-stream if the draft validates
+    cancel_fallback = threading.Event()
+    fallback_future = None
+    if MULTI_LLM_SPECULATIVE:
+        fallback_future = _stage_pool.submit(attempt_hcx_fallback, question, full_context, hcx_client, cancel_fallback)
     
-    hcx_response = hcx_client.chat.completions.create(
+    hcx_recommendation = stream_hcx_completion(
+        hcx_client,
         model="HCX-005",
         messages=[
             {"role": "system", "content": "MSP 평가 전문가로서 데이터 기반의 객관적 추천을 제공합니다."},
@@ -209,22 +250,50 @@ def call_hcx_responder(question: str, full_context: str):
         temperature=0.3,
         max_tokens=800
     )
-    
-    hcx_recommendation = hcx_response.choices[0].message.content.strip()
     print(f"✅ HCX Response length: {len(hcx_recommendation)} chars")
+
+    # Review the draft while the fallback is still running; kept if the fallback does not win
+    speculative_critic = None
+    if MULTI_LLM_SPECULATIVE:
+        speculative_critic = (
+            hcx_recommendation,
+            _stage_pool.submit(call_claude_critic, question, hcx_recommendation, full_context)
+        )
     
     # Validate and potentially use fallback
-    validation_result = validate_and_fallback_hcx(hcx_recommendation, question, hcx_client, full_context)
+    validation_result = validate_and_fallback_hcx(hcx_recommendation, question, hcx_client, full_context,
+                                                  fallback_future=fallback_future, cancel_fallback=cancel_fallback)
     
     return {
         "recommendation": validation_result["final_recommendation"],
         "quality_metrics": validation_result["quality_metrics"],
-        "fallback_used": validation_result["fallback_used"]
+        "fallback_used": validation_result["fallback_used"],
+        "speculative_critic": speculative_critic
     }
 
 
-def validate_and_fallback_hcx(hcx_recommendation: str, question: str, hcx_client, full_context: str):
-    """Validate HCX response quality and apply fallback if needed"""
+def stream_hcx_completion(hcx_client, cancel_event=None, **kwargs):
+    """Stream an HCX chat completion and return the full text; None if cancel_event is set mid-stream"""
+    stream = hcx_client.chat.completions.create(stream=True, **kwargs)
+    parts = []
+    try:
+        for chunk in stream:
+            if cancel_event is not None and cancel_event.is_set():
+                print("🛑 HCX stream cancelled")
+                return None
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+    finally:
+        stream.close()
+    return "".join(parts).strip()
+
+
+def validate_and_fallback_hcx(hcx_recommendation: str, question: str, hcx_client, full_context: str,
+                              fallback_future=None, cancel_fallback=None):
+    """
+    Validate HCX response quality and apply fallback if needed.
+    With a speculative fallback_future the fallback is already running; it is cancelled when the draft passes.
+    """
     
     def validate_hcx_response(response_text, question):
         """Validate HCX response quality"""
@@ -262,8 +331,11 @@ def validate_and_fallback_hcx(hcx_recommendation: str, question: str, hcx_client
     if validation_issues:
         print(f"⚠️ HCX validation issues detected: {validation_issues}")
         
-        # Attempt fallback
-        fallback_result = attempt_hcx_fallback(question, full_context, hcx_client)
+        # Attempt fallback (or collect the speculative one)
+        if fallback_future is not None:
+            fallback_result = fallback_future.result()
+        else:
+            fallback_result = attempt_hcx_fallback(question, full_context, hcx_client)
         
         if fallback_result["success"]:
             fallback_issues = validate_hcx_response(fallback_result["recommendation"], question)
@@ -279,6 +351,8 @@ def validate_and_fallback_hcx(hcx_recommendation: str, question: str, hcx_client
             print(f"❌ Fallback failed: {fallback_result['error']}")
     else:
         print(f"✅ HCX response passed validation checks")
+        if cancel_fallback is not None:
+            cancel_fallback.set()
     
     return {
         "final_recommendation": final_recommendation,
@@ -291,7 +365,7 @@ def validate_and_fallback_hcx(hcx_recommendation: str, question: str, hcx_client
     }
 
 
-def attempt_hcx_fallback(question: str, full_context: str, hcx_client):
+def attempt_hcx_fallback(question: str, full_context: str, hcx_client, cancel_event=None):
     """Attempt fallback with enhanced prompt for HCX"""
     fallback_prompt = f"""이전 응답이 너무 간략하거나 구체성이 부족했습니다. 다음 평가 데이터를 바탕으로 더 상세하고 구체적인 MSP 추천을 해주세요.
 
@@ -317,7 +391,9 @@ def attempt_hcx_fallback(question: str, full_context: str, hcx_client):
 최소 400자 이상, 구체적 근거 중심으로 작성해주세요."""
 
     try:
-        fallback_response = hcx_client.chat.completions.create(
+        fallback_recommendation = stream_hcx_completion(
+            hcx_client,
+            cancel_event=cancel_event,
             model="HCX-005",
             messages=[
                 {"role": "system", "content": "MSP 평가 전문가로서 구체적이고 상세한 데이터 기반 추천을 제공합니다. 일반적 표현을 피하고 구체적 근거와 수치를 중심으로 응답합니다."},
@@ -327,10 +403,12 @@ def attempt_hcx_fallback(question: str, full_context: str, hcx_client):
             temperature=0.2,
             max_tokens=1000
         )
+        if fallback_recommendation is None:
+            return {"success": False, "error": "cancelled"}
         
         return {
             "success": True,
-            "recommendation": fallback_response.choices[0].message.content.strip()
+            "recommendation": fallback_recommendation
         }
         
     except Exception as e:
@@ -371,7 +449,10 @@ def call_claude_critic(question: str, hcx_recommendation: str, full_context: str
 **개선 제안**
 - 추가 고려사항: [놓친 중요한 요소들]
 - 대안 후보: [고려해야 할 다른 회사들]
-- 순위 조정 필요성: [순위 변경이 필요한 이유]"""
+- 순위 조정 필요성: [순위 변경이 필요한 이유]
+
+**최종 판정**
+- 수정 필요 여부: [수정 필요/수정 불필요] (문제가 전혀 없을 때만 수정 불필요)"""
 
     claude_client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
     
@@ -391,10 +472,16 @@ def call_claude_critic(question: str, hcx_recommendation: str, full_context: str
     
     return {
         "analysis": critic_analysis,
-        "analysis_length": len(critic_analysis)
+        "analysis_length": len(critic_analysis),
+        "needs_refinement": critic_needs_refinement(critic_analysis)
     }
 
 
+def critic_needs_refinement(critic_analysis: str) -> bool:
+    """False only when the critic's verdict line explicitly says no changes are needed"""
+    return not re.search(r"수정 필요 여부\s*\**\s*[:：]?\s*\**\s*\[?\s*수정 불필요", critic_analysis)
+
+
 def call_claude_refiner(question: str, hcx_recommendation: str, critic_analysis: str, full_context: str):
     """Call Claude to create final refined recommendation"""
     import anthropic
@@ -472,7 +559,7 @@ def compile_final_response(final_recommendation: str, raw_data: dict, context_da
     
     return {
         "answer": final_recommendation,
-        "evidence": raw_data["query_results"]["metadatas"][0],
+        "evidence": [hit.metadata for hit in raw_data["hits"]],
         "model_used": "multi-llm-hcx-claude-critic-refiner",
         "analysis_quality": "multi_model_validated",
         "companies_analyzed": len(raw_data["grouped_chunks"]),
@@ -489,6 +576,7 @@ def compile_final_response(final_recommendation: str, raw_data: dict, context_da
         },
         "system_metadata": {
             "fallback_used": hcx_result["fallback_used"],
+            "refiner_skipped": final_result.get("refiner_skipped", False),
             "validation_passed": len(hcx_result["quality_metrics"]["validation_issues"]) == 0,
             "context_selection_method": "avg_score_based"
         }
@@ -0,0 +1,136 @@
+import os
+import re
+import json
+import threading
+import unicodedata
+import numpy as np
+from cache_store import PersistentCache, make_cache_key
+import company_store
+
+# Full LLM answers keyed by (normalized question, min_score, route, store version)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+# Cosine similarity needed for a differently-worded question to reuse a cached answer
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95"))
+RESPONSE_CACHE_SEMANTIC_PER_SCOPE = int(os.getenv("RESPONSE_CACHE_SEMANTIC_PER_SCOPE", "500"))
+
+response_cache = PersistentCache(
+    "response_cache",
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+    encode=lambda value: json.dumps(value, ensure_ascii=False, default=str),
+)
+
+_TRAILING_PUNCT = re.compile(r"[\s?？!.。~]+$")
+_WHITESPACE = re.compile(r"\s+")
+
+# Per-scope embeddings of cached questions: (route, min_score, version) -> [(unit vector, cache key)]
+_semantic_index = {}
+_semantic_lock = threading.Lock()
+_semantic_hits = 0
+
+
+def normalize_question(question: str) -> str:
+    text = unicodedata.normalize("NFKC", question or "").casefold().strip()
+    text = _TRAILING_PUNCT.sub("", text)
+    return _WHITESPACE.sub(" ", text)
+
+
+def _embed(question: str):
+    # Shares the persistent embedding cache with the query handlers, so this rarely costs an API call
+    from vector_writer import clova_embedding
+    vector = np.asarray(clova_embedding(question), dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+
+def _semantic_lookup(scope, vector):
+    with _semantic_lock:
+        entries = list(_semantic_index.get(scope, ()))
+    if not entries or vector is None:
+        return None
+    matrix = np.stack([entry[0] for entry in entries])
+    similarities = matrix @ vector
+    best = int(np.argmax(similarities))
+    if similarities[best] >= RESPONSE_CACHE_SIMILARITY:
+        return entries[best][1], float(similarities[best])
+    return None
+
+
+def _semantic_add(scope, vector, key):
+    if vector is None:
+        return
+    with _semantic_lock:
+        # Entries for older store versions can never hit again
+        for stale_scope in [s for s in _semantic_index if s[:2] == scope[:2] and s[2] != scope[2]]:
+            del _semantic_index[stale_scope]
+        entries = _semantic_index.setdefault(scope, [])
+        entries.append((vector, key))
+        del entries[:-RESPONSE_CACHE_SEMANTIC_PER_SCOPE]
+
+
+def is_cacheable(result) -> bool:
+    """
+    Only successful answers are worth replaying: a non-empty answer backed by retrieved evidence
+    and no error marker. Not-found / name-not-recognized replies carry no evidence and are skipped.
+    """
+    if not isinstance(result, dict) or result.get("error") or result.get("success") is False:
+        return False
+    answer = result.get("answer")
+    return isinstance(answer, str) and bool(answer.strip()) and bool(result.get("evidence"))
+
+
+def _scope_resolved(route: str) -> bool:
+    """Scoped routes ("information:<msp>") need a resolved company; "information:" must not be shared"""
+    if ":" not in route:
+        return True
+    scope = route.split(":", 1)[1].strip()
+    return bool(scope) and scope != "None"
+
+
+def cached_call(route: str, question: str, min_score, func, *args, **kwargs):
+    """
+    Return func(*args, **kwargs), reusing a cached answer for the same (or a near-identical) question
+    on the same route while the vector store is unchanged. Only successful answers are cached
+    (see is_cacheable), and routes scoped to an unresolved company bypass the cache entirely.
+    """
+    global _semantic_hits
+    if not RESPONSE_CACHE_ENABLED or not _scope_resolved(route):
+        return func(*args, **kwargs)
+
+    version = company_store.get_store_version()
+    normalized = normalize_question(question)
+    key = make_cache_key(normalized, min_score, route, version)
+
+    cached = response_cache.get(key)
+    if cached is not None:
+        print(f"⚡ Response cache hit (exact) for route {route}")
+        return {**cached, "response_cache": "exact"}
+
+    scope = (route, min_score, version)
+    vector = None
+    try:
+        vector = _embed(normalized)
+        match = _semantic_lookup(scope, vector)
+        if match:
+            similar_key, similarity = match
+            cached = response_cache.get(similar_key)
+            if cached is not None:
+                _semantic_hits += 1
+                print(f"⚡ Response cache hit (similarity {similarity:.3f}) for route {route}")
+                return {**cached, "response_cache": "semantic"}
+    except Exception as e:
+        print(f"[WARNING] Response cache similarity lookup failed: {e}")
+
+    result = func(*args, **kwargs)
+    if is_cacheable(result):
+        response_cache.set(key, result)
+        _semantic_add(scope, vector, key)
+    return result
+
+
+def stats():
+    with _semantic_lock:
+        semantic_entries = sum(len(entries) for entries in _semantic_index.values())
+    return {**response_cache.stats(), "semantic_hits": _semantic_hits, "semantic_entries": semantic_entries}
@@ -0,0 +1,167 @@
+import os
+from dataclasses import dataclass
+from bm25_index import reciprocal_rank_fusion
+from utils import numeric_score
+
+# Hybrid retrieval: dense vector hits fused with a lexical BM25 ranking by reciprocal-rank fusion
+HYBRID_RETRIEVAL_ENABLED = os.getenv("HYBRID_RETRIEVAL_ENABLED", "true").lower() == "true"
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+# Candidates taken from each ranking before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "40"))
+# Extra vector candidates fetched when the score filter has to run in Python (store not yet migrated)
+SCORE_FILTER_OVERFETCH = int(os.getenv("SCORE_FILTER_OVERFETCH", "3"))
+
+
+@dataclass
+class Hit:
+    """One retrieved chunk; relevance is in (0, 1], higher is better"""
+    id: str
+    metadata: dict
+    document: str = None
+    distance: float = None
+    relevance: float = 0.0
+
+    @property
+    def msp_name(self):
+        return self.metadata.get("msp_name")
+
+    @property
+    def question(self):
+        return self.metadata.get("question", "")
+
+    @property
+    def answer(self):
+        return self.metadata.get("answer", "")
+
+    @property
+    def score(self):
+        return self.metadata.get("score")
+
+    @property
+    def category(self):
+        return self.metadata.get("category", "미분류")
+
+    @property
+    def group(self):
+        return self.metadata.get("group", "기타")
+
+
+def build_where(msp_name: str = None, min_score: int = None, group: str = None, category: str = None,
+                question: str = None, require_answer: bool = True, push_score: bool = True):
+    """
+    Translate chunk filters into a Chroma where clause (None when unfiltered).
+    The score filter is a numeric $gte, which skips numeric-string scores; pass push_score=False
+    until vector_store.migrate_scores has run and apply metadata_matches to the results instead.
+    """
+    conditions = []
+    if require_answer:
+        conditions.append({"answer": {"$ne": ""}})
+    if msp_name:
+        conditions.append({"msp_name": msp_name})
+    if question:
+        conditions.append({"question": question})
+    if group:
+        conditions.append({"group": group})
+    if category:
+        conditions.append({"category": category})
+    if min_score and push_score:
+        conditions.append({"score": {"$gte": min_score}})
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def metadata_matches(metadata: dict, msp_name: str = None, min_score: int = None, group: str = None,
+                     category: str = None, require_answer: bool = True) -> bool:
+    """Same filters as build_where, evaluated in process (for the BM25 side of a hybrid search)"""
+    if require_answer and not metadata.get("answer"):
+        return False
+    if msp_name and metadata.get("msp_name") != msp_name:
+        return False
+    if group and metadata.get("group") != group:
+        return False
+    if category and metadata.get("category") != category:
+        return False
+    if min_score:
+        score = numeric_score(metadata.get("score"))
+        if score is None or score < min_score:
+            return False
+    return True
+
+
+class Retriever:
+    """
+    Scoped chunk retrieval: filters are pushed into the Chroma where clause (and applied inside
+    the BM25 index), so a query returns up to k matching chunks instead of a global top-k that
+    callers then filter down.
+    """
+
+    def __init__(self, collection, embed, bm25_index=None, hybrid: bool = HYBRID_RETRIEVAL_ENABLED,
+                 rrf_k: int = HYBRID_RRF_K, candidates: int = HYBRID_CANDIDATES, scores_numeric=None):
+        self.collection = collection
+        self.embed = embed
+        self.bm25_index = bm25_index
+        # scores_numeric() -> whether the score filter can be pushed into Chroma
+        self.scores_numeric = scores_numeric or (lambda: True)
+        self.hybrid = hybrid and bm25_index is not None
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+
+    def search(self, question: str, k: int, msp_name: str = None, min_score: int = None, group: str = None,
+               category: str = None, include=("metadatas",), require_answer: bool = True):
+        """Return up to k Hits best first; include selects "metadatas" and/or "documents" """
+        filters = dict(msp_name=msp_name, min_score=min_score, group=group, category=category,
+                       require_answer=require_answer)
+        n_candidates = max(k, self.candidates) if self.hybrid else k
+        push_score = not min_score or self.scores_numeric()
+        query_include = list(include) if push_score else list(set(include) | {"metadatas"})
+        results = self.collection.query(
+            query_embeddings=[self.embed(question)],
+            n_results=n_candidates if push_score else n_candidates * SCORE_FILTER_OVERFETCH,
+            where=build_where(**filters, push_score=push_score),
+            include=query_include + ["distances"]
+        )
+        ids = results["ids"][0]
+        metadatas = (results.get("metadatas") or [[{}] * len(ids)])[0]
+        documents = (results.get("documents") or [[None] * len(ids)])[0]
+        distances = results["distances"][0]
+        vector_hits = [
+            Hit(chunk_id, metadata or {}, document, distance, 1.0 / (1.0 + max(float(distance), 0.0)))
+            for chunk_id, metadata, document, distance in zip(ids, metadatas, documents, distances)
+        ]
+        if not push_score:
+            vector_hits = [hit for hit in vector_hits if metadata_matches(hit.metadata, **filters)][:n_candidates]
+            if "metadatas" not in include:
+                for hit in vector_hits:
+                    hit.metadata = {}
+            ids = [hit.id for hit in vector_hits]
+        if not self.hybrid:
+            return vector_hits[:k]
+
+        try:
+            lexical = self.bm25_index.search(
+                question, n_candidates, msp_name=msp_name,
+                accept=lambda metadata: metadata_matches(metadata, **filters)
+            )
+        except Exception as e:
+            print(f"[WARNING] BM25 search failed, using vector results only: {e}")
+            return vector_hits[:k]
+
+        by_id = {hit.id: hit for hit in vector_hits}
+        best_possible = 2.0 / (self.rrf_k + 1)
+        hits = []
+        fused = reciprocal_rank_fusion([ids, [chunk_id for chunk_id, _ in lexical]], k=self.rrf_k)
+        for chunk_id, fused_score in fused:
+            hit = by_id.get(chunk_id)
+            if hit is None:
+                record = self.bm25_index.record(chunk_id)
+                if record is None:
+                    continue
+                metadata, document = record
+                hit = Hit(chunk_id, metadata if "metadatas" in include else {},
+                          document if "documents" in include else None)
+            hit.relevance = fused_score / best_possible
+            hits.append(hit)
+            if len(hits) >= k:
+                break
+        return hits
@@ -1,4 +1,43 @@
+import os
+import asyncio
 import datetime
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# Bounded pool for blocking SDK / Chroma work called from async routes
+BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", "32"))
+_blocking_pool = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking")
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the bounded pool without stalling the event loop, keeping contextvars"""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_blocking_pool, functools.partial(ctx.run, func, *args, **kwargs))
+
+def numeric_score(value):
+    """
+    Score as a number, or None when it is not one. Failed evaluations can leave text such as
+    "Error in API response..." in the score field; numeric strings ("4") still count.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            try:
+                return float(value.strip())
+            except ValueError:
+                return None
+    return None
+
+def normalize_score(value):
+    """Numeric scores (including numeric strings) as numbers; anything else is returned unchanged"""
+    number = numeric_score(value)
+    return value if number is None else number
 
 def fix_korean_encoding(text):
     """Fix Korean character encoding issues"""
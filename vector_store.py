@@ -0,0 +1,95 @@
+import os
+from chromadb import PersistentClient
+import company_store
+from utils import normalize_score
+
+# The one Chroma client and collection for this process; import these instead of opening new clients
+CHROMA_PATH = os.getenv("CHROMA_PATH", os.path.abspath("chroma_store"))
+COLLECTION_NAME = "msp_chunks"
+
+# HNSW settings applied when the collection is first created. An existing collection keeps the
+# distance metric it was created with; changing it needs a fresh store and a re-ingest.
+HNSW_CONFIG = {
+    "hnsw:space": os.getenv("CHROMA_HNSW_SPACE", "cosine"),
+    "hnsw:construction_ef": int(os.getenv("CHROMA_HNSW_CONSTRUCTION_EF", "100")),
+    "hnsw:search_ef": int(os.getenv("CHROMA_HNSW_SEARCH_EF", "100")),
+    "hnsw:M": int(os.getenv("CHROMA_HNSW_M", "16")),
+}
+
+
+def _open_collection(client):
+    try:
+        existing = client.get_collection(COLLECTION_NAME, embedding_function=None)
+    except ValueError:
+        print(f"📦 Creating collection {COLLECTION_NAME} with {HNSW_CONFIG}")
+        return client.create_collection(COLLECTION_NAME, metadata=HNSW_CONFIG, embedding_function=None)
+
+    space = (existing.metadata or {}).get("hnsw:space", "l2")
+    if space != HNSW_CONFIG["hnsw:space"]:
+        print(f"[WARNING] Collection {COLLECTION_NAME} uses hnsw:space={space}, "
+              f"not the configured {HNSW_CONFIG['hnsw:space']}; re-ingest into a new store to change it")
+    return existing
+
+
+client = PersistentClient(path=CHROMA_PATH)
+collection = _open_collection(client)
+
+
+# --- Write version and lifecycle hooks ---
+# The counter and hooks live in company_store so every process sharing the store sees the same version
+def write_version() -> int:
+    return company_store.get_store_version()
+
+
+def register_write_hook(hook):
+    """hook(msp_name) runs after every write; msp_name is None when many companies may have changed"""
+    company_store.register_write_hook(hook)
+
+
+def notify_write(msp_name: str = None) -> int:
+    """Call after adding or deleting chunks; bumps the write version, runs the hooks and returns the version"""
+    return company_store.notify_company_changed(msp_name)
+
+
+# --- Score migration ---
+# Score filters are pushed into Chroma as a numeric $gte, which skips numeric-string scores written by
+# older ingests. Until migrate_scores has converted them, callers filter scores in Python instead.
+SCORES_NUMERIC_KEY = "scores_numeric"
+_scores_numeric = False
+
+
+def scores_numeric() -> bool:
+    """True once every numeric score in the store is stored as a number"""
+    global _scores_numeric
+    if not _scores_numeric:
+        _scores_numeric = company_store.get_meta(SCORES_NUMERIC_KEY) == "1"
+    return _scores_numeric
+
+
+def migrate_scores(page_size: int = 500) -> int:
+    """Convert numeric-string scores to numbers once per store; returns the number of chunks rewritten"""
+    global _scores_numeric
+    if scores_numeric():
+        return 0
+
+    ids, metadatas = [], []
+    offset = 0
+    while True:
+        page = collection.get(limit=page_size, offset=offset, include=["metadatas"])
+        for chunk_id, meta in zip(page["ids"], page["metadatas"]):
+            score = (meta or {}).get("score")
+            if isinstance(score, str) and normalize_score(score) is not score:
+                ids.append(chunk_id)
+                metadatas.append({**meta, "score": normalize_score(score)})
+        offset += len(page["ids"])
+        if len(page["ids"]) < page_size:
+            break
+
+    for i in range(0, len(ids), page_size):
+        collection.update(ids=ids[i:i + page_size], metadatas=metadatas[i:i + page_size])
+    company_store.set_meta(SCORES_NUMERIC_KEY, "1")
+    _scores_numeric = True
+    if ids:
+        print(f"📦 Converted {len(ids)} numeric-string scores to numbers")
+        notify_write()
+    return len(ids)
@@ -1,31 +1,28 @@
-import chromadb
 import os
+import time
+import json
+import hashlib
 import datetime
+from collections import defaultdict
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
 load_dotenv()
-from chromadb import PersistentClient
 from sentence_transformers import SentenceTransformer
 
-import requests
-import uuid
-import http.client
-import json
+from clova_client import post_json
+from cache_store import PersistentCache, make_cache_key
+from utils import normalize_score
+import company_store
+
+SEGMENTATION_MAX_CONCURRENCY = int(os.getenv("SEGMENTATION_MAX_CONCURRENCY", "4"))
+CHROMA_WRITE_BATCH_SIZE = int(os.getenv("CHROMA_WRITE_BATCH_SIZE", "100"))
 
 def chunk_text(text: str):
     text = text.strip()
     if not text:
         return []
 
-    host = "clovastudio.stream.ntruss.com"
-    request_id = str(uuid.uuid4().hex)
-    api_key = f"Bearer {os.getenv('CLOVA_API_KEY')}"
-
-    headers = {
-        'Content-Type': 'application/json; charset=utf-8',
-        'Authorization': api_key,
-        'X-NCP-CLOVASTUDIO-REQUEST-ID': request_id
-    }
-
     completion_request = {
         "postProcessMaxSize": 1000,
         "alpha": 0.0,
@@ -36,11 +33,7 @@ def chunk_text(text: str):
     }
 
     try:
-        conn = http.client.HTTPSConnection(host)
-        conn.request('POST', '/serviceapp/v1/api-tools/segmentation', json.dumps(completion_request), headers)
-        response = conn.getresponse()
-        result = json.loads(response.read().decode(encoding='utf-8'))
-        conn.close()
+        result, _ = post_json('/serviceapp/v1/api-tools/segmentation', completion_request)
 
         if result["status"]["code"] == "20000":
             return [' '.join(segment) for segment in result["result"]["topicSeg"]]
@@ -52,47 +45,47 @@ def chunk_text(text: str):
         return [text]
 from sheets_reader import INTERVIEW_SHEET_DOC_NAME, connect_to_sheets, get_company_data_from_sheet, get_summary_scores
 
-# Initialize Chroma client and collection
-CHROMA_PATH = os.path.abspath("chroma_store")
-client = PersistentClient(path=CHROMA_PATH)
+# Shared Chroma collection (1024-dimension CLOVA embeddings, supplied by us rather than an embedding_function)
+from vector_store import collection, notify_write
 
-# Set collection settings to expect 1024-dimension embeddings
-from chromadb.config import Settings
-from chromadb.utils import embedding_functions
+EMBEDDING_PATH = "/serviceapp/v1/api-tools/embedding/v2"
+# Per-call limit, kept below the query-time evidence deadlines so a slow call frees its worker
+EMBEDDING_TIMEOUT = float(os.getenv("EMBEDDING_TIMEOUT", "10"))
 
-collection = client.get_or_create_collection(
-    name="msp_chunks",
-    metadata={"hnsw:space": "cosine"},
-    embedding_function=None,
+def _encode_vector(vector):
+    return array("f", vector).tobytes()
+
+def _decode_vector(blob):
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+# Embeddings are stored as float32 blobs keyed by a hash of the endpoint and text,
+# shared by ingestion (clova_embeddings) and queries (msp_core.query_embed)
+embedding_cache = PersistentCache(
+    "embedding_cache",
+    max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000")),
+    encode=_encode_vector,
+    decode=_decode_vector,
 )
 
 # Load embedding model
 def clova_embedding(text: str):
-    host = "clovastudio.stream.ntruss.com"
-    request_id = str(uuid.uuid4().hex)
-    api_key = f"Bearer {os.getenv('CLOVA_API_KEY')}"
-
-    headers = {
-        "Content-Type": "application/json; charset=utf-8",
-        "Authorization": api_key,
-        "X-NCP-CLOVASTUDIO-REQUEST-ID": request_id
-    }
+    cache_key = make_cache_key(EMBEDDING_PATH, text)
+    cached = embedding_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-    body = json.dumps({ "text": text })
-    conn = http.client.HTTPSConnection(host)
-    conn.request("POST", "/serviceapp/v1/api-tools/embedding/v2", body, headers)
-    response = conn.getresponse()
     try:
-        result = json.loads(response.read().decode("utf-8"))
-    except Exception as e:
+        result, _ = post_json(EMBEDDING_PATH, {"text": text}, timeout=EMBEDDING_TIMEOUT)
+    except ValueError as e:
         print(f"[Embedding API Error] Failed to parse JSON response: {e}")
-        conn.close()
         return []
-    conn.close()
 
     if isinstance(result, dict) and result.get("status", {}).get("code") == "20000":
         embedding = result.get("result", {}).get("embedding")
         if embedding and isinstance(embedding, list):
+            embedding_cache.set(cache_key, embedding)
             return embedding
         else:
             print(f"[Embedding API Error] Unexpected embedding format: {embedding}")
@@ -101,6 +94,32 @@ def clova_embedding(text: str):
         print(f"[Embedding API Error] {result}")
         return []
 
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "8"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "2"))
+
+def _embed_with_retry(text: str, retries: int):
+    for attempt in range(retries + 1):
+        try:
+            embedding = clova_embedding(text)
+        except Exception as e:
+            print(f"[Embedding API Error] Attempt {attempt + 1} failed: {e}")
+            embedding = []
+        if embedding:
+            return embedding
+        if attempt < retries:
+            time.sleep(0.5 * (2 ** attempt))
+    return []
+
+def clova_embeddings(texts: list, max_concurrency: int = None, retries: int = EMBEDDING_MAX_RETRIES):
+    """Embed many texts in parallel; the result is aligned with texts, with [] for items that still failed after retries"""
+    texts = list(texts)
+    if not texts:
+        return []
+
+    workers = max(1, min(max_concurrency or EMBEDDING_MAX_CONCURRENCY, len(texts)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embedding") as pool:
+        return list(pool.map(lambda text: _embed_with_retry(text, retries), texts))
+
 # Delete existing company data before adding new data
 def delete_company_data_from_chroma(company_name: str):
     """Delete all existing data for a company before adding new data"""
@@ -122,61 +141,180 @@ def delete_company_data_from_chroma(company_name: str):
         print(f"❌ Error deleting existing data for {company_name}: {e}")
         # Don't raise - allow the upload to continue
 
-def add_msp_data_to_chroma(company_name, company_data, summary):
-    # Delete existing data first
-    delete_company_data_from_chroma(company_name)
-    
-    # EVERYTHING ELSE REMAINS EXACTLY THE SAME AS ORIGINAL
-    documents = []
-    embeddings = []
-    metadatas = []
-    ids = []
+def row_fingerprint(question, answer, score, occurrence=0):
+    """Stable content hash of one interview row; occurrence separates exact duplicate rows"""
+    payload = json.dumps([question, answer, score, occurrence], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
 
-    # Print summary types for debugging
-    print(f"Summary types for debugging: {[ (row.get('Category'), type(row)) for row in summary ]}")
-    for idx, entry in enumerate(company_data):
+def _fingerprint_rows(company_data):
+    rows = []
+    seen = defaultdict(int)
+    for entry in company_data:
         question = entry.get('question', '')
         answer = entry["answer"]
         score = entry["score"]
-        chunks = chunk_text(answer)
-        for cidx, chunk in enumerate(chunks):
-            document = f"Q: {question}\nA: {chunk}"
-            embedding = clova_embedding(document)
-            if not embedding:
-                continue
-            uid = f"{company_name}_{idx}_{cidx}"
-            # Clean summary, log and skip problematic keys
-            cleaned_summary = {}
-            for item in summary:
-                k = item.get('Category')
-                v = item.get('Score')
-                if k is None:
-                    print(f"[Metadata Error] Found summary item None as key: {item}")
+        base = (question, answer, score)
+        fingerprint = row_fingerprint(question, answer, score, seen[base])
+        seen[base] += 1
+        rows.append({"question": question, "answer": answer, "score": score, "fingerprint": fingerprint})
+    return rows
+
+# Fields every chunk carries; company-level summary scores live in company_store keyed by msp_name
+CHUNK_METADATA_FIELDS = {"msp_name", "question", "answer", "score", "row_fingerprint", "timestamp", "group", "category"}
+
+def _ingest_rows(company_name, rows, timestamp):
+    """
+    Pipelined ingest: answers are segmented concurrently, each finished segmentation immediately
+    queues its chunks for embedding, and rows are upserted in batches as soon as
+    CHROMA_WRITE_BATCH_SIZE embedded chunks are ready, while the other stages keep running.
+    A row is written only when every one of its chunks embedded, so a row with a failed chunk keeps
+    no fingerprint in the store and is retried by the next incremental run.
+    Returns the number of chunks written.
+    """
+    segment_futures = {}    # segmentation future -> row
+    embedding_futures = {}  # embedding future -> (row index, chunk index)
+    row_chunks = {}         # row index -> [(uid, document, metadata, embedding)], embedding None until ready
+    row_waiting = {}        # row index -> chunks still embedding
+    batch = []
+    written = 0
+    skipped_rows = 0
+
+    def write_batch(batch):
+        collection.upsert(
+            documents=[document for _, document, _, _ in batch],
+            embeddings=[embedding for _, _, _, embedding in batch],
+            metadatas=[metadata for _, _, metadata, _ in batch],
+            ids=[uid for uid, _, _, _ in batch]
+        )
+        return len(batch)
+
+    with ThreadPoolExecutor(max_workers=SEGMENTATION_MAX_CONCURRENCY, thread_name_prefix="segmentation") as seg_pool, \
+         ThreadPoolExecutor(max_workers=EMBEDDING_MAX_CONCURRENCY, thread_name_prefix="embedding") as embed_pool:
+
+        # Stage 1: segmentation across answers
+        for ridx, row in enumerate(rows):
+            segment_futures[seg_pool.submit(chunk_text, row["answer"])] = (ridx, row)
+
+        in_flight = set(segment_futures)
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in segment_futures:
+                    # Stage 2: embed a row's chunks as soon as its segmentation finishes
+                    ridx, row = segment_futures.pop(future)
+                    question = row["question"]
+                    chunks = []
+                    for cidx, chunk in enumerate(future.result()):
+                        document = f"Q: {question}\nA: {chunk}"
+                        uid = f"{company_name}_{row['fingerprint'][:16]}_{cidx}"
+                        metadata = {
+                            "msp_name": company_name,
+                            "question": question,
+                            "answer": chunk,
+                            # Numeric so score filters can be pushed down to Chroma; error text is kept as-is
+                            "score": normalize_score(row["score"]),
+                            "row_fingerprint": row["fingerprint"],
+                            "timestamp": timestamp
+                        }
+                        chunks.append((uid, document, metadata, None))
+                        embedding_future = embed_pool.submit(_embed_with_retry, document, EMBEDDING_MAX_RETRIES)
+                        embedding_futures[embedding_future] = (ridx, cidx)
+                        in_flight.add(embedding_future)
+                    if chunks:
+                        row_chunks[ridx] = chunks
+                        row_waiting[ridx] = len(chunks)
+                    continue
+
+                # Stage 3: once a row is fully embedded, queue it for the next write batch
+                ridx, cidx = embedding_futures.pop(future)
+                uid, document, metadata, _ = row_chunks[ridx][cidx]
+                row_chunks[ridx][cidx] = (uid, document, metadata, future.result())
+                row_waiting[ridx] -= 1
+                if row_waiting[ridx]:
                     continue
-                if isinstance(v, (str, int, float, bool)) or v is None:
-                    cleaned_summary[k] = v
+                del row_waiting[ridx]
+                chunks = row_chunks.pop(ridx)
+                if all(embedding for _, _, _, embedding in chunks):
+                    batch.extend(chunks)
                 else:
-                    print(f"[Metadata Error] Key '{k}' has invalid type {type(v)}. Value: {v}")
-
-            metadata = {
-                "msp_name": company_name,
-                "question": question,
-                "answer": chunk,
-                "score": score,
-                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-                **cleaned_summary
-            }
-            documents.append(document)
-            embeddings.append(embedding)
-            metadatas.append(metadata)
-            ids.append(uid)
-
-    collection.add(
-        documents=documents,
-        embeddings=embeddings,
-        metadatas=metadatas,
-        ids=ids
-    )
+                    skipped_rows += 1
+
+            while len(batch) >= CHROMA_WRITE_BATCH_SIZE:
+                written += write_batch(batch[:CHROMA_WRITE_BATCH_SIZE])
+                batch = batch[CHROMA_WRITE_BATCH_SIZE:]
+
+    if batch:
+        written += write_batch(batch)
+
+    if skipped_rows:
+        print(f"[Embedding API Error] Skipping {skipped_rows} rows with chunks that failed to embed; "
+              f"they are retried on the next upload")
+    print(f"[EMBEDDING CACHE] {embedding_cache.stats()}")
+    return written
+
+def add_msp_data_to_chroma(company_name, company_data, summary, incremental=True):
+    """
+    Write a company's evaluated rows to Chroma.
+    In incremental mode only rows whose (question, answer, score) fingerprint is new are
+    segmented, embedded and upserted, and chunks of rows that vanished are deleted.
+    Chunks written before fingerprints existed are treated as vanished and replaced.
+    The company summary is stored once in company_store rather than on every chunk.
+    """
+    rows = _fingerprint_rows(company_data)
+    timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+    # Print summary types for debugging
+    print(f"Summary types for debugging: {[ (row.get('Category'), type(row)) for row in summary ]}")
+    company_store.save_summary(company_name, company_store.clean_summary(summary), timestamp)
+
+    legacy_keys = {}
+    if not incremental:
+        delete_company_data_from_chroma(company_name)
+        changed_rows = rows
+        kept_ids = []
+        stale_ids = []
+    else:
+        existing = collection.get(where={"msp_name": company_name}, include=["metadatas"])
+        ids_by_fingerprint = defaultdict(list)
+        for uid, meta in zip(existing["ids"], existing["metadatas"]):
+            meta = meta or {}
+            ids_by_fingerprint[meta.get("row_fingerprint")].append(uid)
+            extra = set(meta) - CHUNK_METADATA_FIELDS
+            if extra:
+                legacy_keys[uid] = extra
+
+        new_fingerprints = {row["fingerprint"] for row in rows}
+        changed_rows = [row for row in rows if row["fingerprint"] not in ids_by_fingerprint]
+        kept_ids = [uid for fp, uids in ids_by_fingerprint.items() if fp in new_fingerprints for uid in uids]
+        stale_ids = [uid for fp, uids in ids_by_fingerprint.items() if fp not in new_fingerprints for uid in uids]
+
+    print(f"🔁 {company_name}: {len(changed_rows)} new/changed rows, "
+          f"{len(rows) - len(changed_rows)} unchanged, {len(stale_ids)} stale chunks")
+
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+
+    # Strip summary fields that older ingests splatted into unchanged chunks
+    legacy_ids = [uid for uid in kept_ids if uid in legacy_keys]
+    if legacy_ids:
+        collection.update(
+            ids=legacy_ids,
+            metadatas=[{key: None for key in legacy_keys[uid]} for uid in legacy_ids]
+        )
+
+    written = _ingest_rows(company_name, changed_rows, timestamp) if changed_rows else 0
+    if not written:
+        print(f"ℹ️ No new chunks to write for {company_name}")
+
+    if written or stale_ids or legacy_ids or not incremental:
+        notify_write(company_name)
+
+    return {
+        "changed_rows": len(changed_rows),
+        "unchanged_rows": len(rows) - len(changed_rows),
+        "written_chunks": written,
+        "deleted_chunks": len(stale_ids),
+    }
 
 def run_from_msp_name(company_name: str):
     print(f"Running vector DB update for: {company_name}")